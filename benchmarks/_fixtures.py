@@ -0,0 +1,60 @@
+"""Shared helpers for the offline benchmarks: fixture loading and import paths."""
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(ROOT, "mcp-bearer-token")
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+SAMPLE_STATE = os.path.join(ROOT, "udaipur1.json")
+SAMPLE_DATE = "20250811"
+
+
+def sample_state() -> dict:
+    with open(SAMPLE_STATE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def sample_page(state: dict | None = None) -> str:
+    """Wrap the Udaipur state in a page shaped like a BookMyShow buytickets response."""
+    state = sample_state() if state is None else state
+    head = "<html><head><title>BookMyShow</title>" + "<meta name=\"x\" content=\"y\">" * 200 + "</head><body>"
+    return (
+        head
+        + "<div id=\"app\"></div><script>window.__INITIAL_STATE__ = "
+        + json.dumps(state, ensure_ascii=False, separators=(",", ":"))
+        + ";</script></body></html>"
+    )
+
+
+def timeit(fn, repeat: int = 20) -> float:
+    """Return the best wall time of `fn()` in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def sample_listing_page(city_slug: str = "udaipur", movies: int = 60) -> str:
+    """
+    Build an explore page shaped like BookMyShow's listing: navigation and
+    footer links around movie cards that each link to /movies/<city>/<slug>/<id>.
+    """
+    nav = "".join(
+        f'<li><a href="https://in.bookmyshow.com/explore/{section}-{city_slug}" class="nav">{section}</a></li>'
+        for section in ("movies", "stream", "events", "plays", "sports", "activities") * 5
+    )
+    cards = "".join(
+        f'<div class="card"><a href="https://in.bookmyshow.com/movies/{city_slug}/movie-title-{i}/ET00{400000 + i}">'
+        f'<div class="poster"><img src="https://assets-in.bmscdn.com/poster/{i}.jpg" alt="Movie {i}" loading="lazy"></div>'
+        f'<div class="title">Movie Title {i}</div><div class="meta">UA &middot; Hindi, Tamil</div></a></div>'
+        for i in range(movies)
+    )
+    footer = "".join(f'<a href="/help/{i}" rel="nofollow">Help {i}</a><span>&nbsp;|&nbsp;</span>' for i in range(200))
+    script = "<script>window.__DATA__ = " + json.dumps({"blob": "x" * 50000}) + ";</script>"
+    return f"<html><head><title>Movies in {city_slug}</title>{script}</head><body><ul>{nav}</ul>{cards}<footer>{footer}</footer></body></html>"
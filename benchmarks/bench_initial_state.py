@@ -0,0 +1,51 @@
+import json
+
+from _fixtures import sample_page, timeit
+
+from initial_state import extract_initial_state
+
+
+def legacy_extract(html: str) -> dict:
+    """The character-by-character brace counter previously inlined in the tools."""
+    marker = "__INITIAL_STATE__"
+    start = html.find(marker)
+    if start == -1:
+        raise RuntimeError("Could not find _INITIAL_STATE_ in HTML")
+
+    start += len(marker)
+    brace_count = 0
+    in_string = False
+    escaped = False
+    json_start = None
+    for i, ch in enumerate(html[start:], start=start):
+        if ch == '"' and not escaped:
+            in_string = not in_string
+        elif ch == "\\" and in_string:
+            escaped = not escaped
+            continue
+        else:
+            escaped = False
+
+        if not in_string:
+            if ch == '{':
+                if brace_count == 0:
+                    json_start = i
+                brace_count += 1
+            elif ch == '}':
+                brace_count -= 1
+                if brace_count == 0 and json_start is not None:
+                    return json.loads(html[json_start:i+1])
+    raise RuntimeError("Could not parse INITIAL_STATE JSON")
+
+
+if __name__ == "__main__":
+    page = sample_page()
+    page_bytes = page.encode("utf-8")
+    assert legacy_extract(page) == extract_initial_state(page) == extract_initial_state(page_bytes)
+
+    print(f"page size: {len(page_bytes) / 1024:.0f} KB")
+    legacy = timeit(lambda: legacy_extract(page), repeat=5)
+    print(f"legacy brace loop (str):  {legacy:8.2f} ms")
+    for label, payload in (("str", page), ("bytes", page_bytes)):
+        ms = timeit(lambda: extract_initial_state(payload))
+        print(f"raw_decode ({label}):{' ' * (12 - len(label))}{ms:8.2f} ms  ({legacy / ms:.1f}x)")
@@ -0,0 +1,17 @@
+from _fixtures import sample_listing_page, timeit
+
+from listing_parser import BACKENDS, etree, parse_listing
+
+if __name__ == "__main__":
+    page = sample_listing_page()
+    expected = parse_listing(page, "udaipur", backend="bs4")
+    print(f"page size: {len(page) / 1024:.0f} KB, {len(expected)} movies")
+
+    baseline = timeit(lambda: parse_listing(page, "udaipur", backend="bs4"), repeat=10)
+    for backend in BACKENDS:
+        if backend == "lxml" and etree is None:
+            print(f"{backend:<11} (not installed)")
+            continue
+        assert parse_listing(page, "udaipur", backend=backend) == expected, backend
+        ms = timeit(lambda: parse_listing(page, "udaipur", backend=backend), repeat=10)
+        print(f"{backend:<11} {ms:8.2f} ms  ({baseline / ms:5.1f}x vs bs4)")
@@ -0,0 +1,39 @@
+import tracemalloc
+
+from _fixtures import SAMPLE_DATE, sample_page, timeit
+
+from initial_state import extract_all_showtime_widgets, extract_initial_state, extract_showtime_widgets, showtime_widgets
+
+
+def full_parse(page: bytes) -> list:
+    return showtime_widgets(extract_initial_state(page), SAMPLE_DATE)
+
+
+def projected_parse(page: bytes) -> list:
+    return extract_showtime_widgets(page, SAMPLE_DATE)
+
+
+def all_dates_parse(page: bytes) -> list:
+    return extract_all_showtime_widgets(page, SAMPLE_DATE)[SAMPLE_DATE]
+
+
+def peak_kb(fn) -> float:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+if __name__ == "__main__":
+    page = sample_page().encode("utf-8")
+    assert full_parse(page) == projected_parse(page) == all_dates_parse(page)
+
+    print(f"page size: {len(page) / 1024:.0f} KB")
+    for label, fn in (
+        ("full parse + walk", full_parse),
+        ("projected parse", projected_parse),
+        ("all show dates", all_dates_parse),
+    ):
+        ms = timeit(lambda: fn(page))
+        print(f"{label:<18} {ms:8.2f} ms   peak {peak_kb(lambda: fn(page)):8.0f} KB")
@@ -0,0 +1,258 @@
+"""
+Offline benchmark for the BookMyShow tools.
+
+Replays recorded pages through a local stand-in for the scrape.do API, then
+measures per-stage latency (fetch, state extraction + JSON parse, widget walk,
+serialization) and end-to-end throughput of get_movies, get_movie_venue_details
+and book_movie_tickets at several concurrency levels. Each run is appended to
+benchmarks/results.jsonl and compared with the previous run.
+
+Usage:
+    python benchmarks/bench_tools.py [--latency-ms 50] [--concurrency 1,4,16]
+                                     [--requests 64] [--fixtures DIR]
+
+--fixtures points at a directory of pages recorded with BMS_DEBUG_SNAPSHOT_DIR
+(`buytickets-<city>-<movie_id>-<date>-*.gz`); without it the Udaipur sample
+state and a synthetic listing page are served.
+"""
+import argparse
+import asyncio
+import glob
+import gzip
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from _fixtures import ROOT, SAMPLE_DATE, sample_listing_page, sample_page
+
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results.jsonl")
+CITY = "udaipur"
+# DebugSnapshots names: buytickets-<city>-<movie_id>-<date>-<timestamp>-<id>.gz.
+# City slugs may contain hyphens (new-delhi), so the fields are read from the right.
+_SNAPSHOT_NAME_RE = re.compile(r"^buytickets-.+-([^-]+)-\d{8}-\d{8}T\d{6}-[0-9a-f]+\.gz$")
+
+
+class ReplayStore:
+    """Maps BookMyShow URLs to recorded page bodies."""
+
+    def __init__(self, fixtures_dir: str | None):
+        self.listing = sample_listing_page(CITY).encode("utf-8")
+        self.buytickets = sample_page().encode("utf-8")
+        self.recorded: dict[str, bytes] = {}
+        if fixtures_dir:
+            for path in sorted(glob.glob(os.path.join(fixtures_dir, "buytickets-*.gz"))):
+                match = _SNAPSHOT_NAME_RE.match(os.path.basename(path))
+                if match is None:
+                    print(f"skipping {path}: not a buytickets snapshot name")
+                    continue
+                with gzip.open(path, "rb") as f:
+                    self.recorded[match.group(1)] = f.read()
+
+    def page_for(self, url: str) -> bytes:
+        if "/explore/movies-" in url:
+            return self.listing
+        if "/buytickets/" in url:
+            movie_id = url.rstrip("/").split("/")[-2]
+            return self.recorded.get(movie_id, self.buytickets)
+        return b"<html></html>"
+
+
+def start_replay_server(store: ReplayStore, latency_ms: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            body = store.page_for(query.get("url", [""])[0])
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer.daemon_threads = True
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def load_server_module(endpoint: str):
+    os.environ.setdefault("AUTH_TOKEN", "bench")
+    os.environ.setdefault("MY_NUMBER", "910000000000")
+    os.environ["API_TOKEN"] = "bench"
+    os.environ["SCRAPE_DO_ENDPOINT"] = endpoint
+    os.environ["BMS_DISK_CACHE_PATH"] = ""
+    os.environ.pop("BMS_DEBUG_SNAPSHOT_DIR", None)
+    import mcp_starter
+    return mcp_starter
+
+
+def reset_caches(server) -> None:
+    for name in ("listing_cache", "movie_index_cache", "showtime_cache", "resolver_cache"):
+        cache = getattr(server, name, None)
+        if cache is not None:
+            cache.clear()
+
+
+def tool_fn(tool):
+    return getattr(tool, "fn", tool)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def measure_stages(server, rounds: int = 20) -> dict:
+    from initial_state import extract_all_showtime_widgets
+    from serialize import dumps_compact
+    from showtimes import extract_venues, venues_to_compact
+
+    url = f"https://in.bookmyshow.com/movies/{CITY}/sample/buytickets/ET00000001/{SAMPLE_DATE}"
+    timings = {"fetch": [], "extract_parse": [], "widget_walk": [], "serialize": []}
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        page = await server.scraper.get_bytes(url)
+        t1 = time.perf_counter()
+        widgets_by_date = extract_all_showtime_widgets(page, SAMPLE_DATE)
+        t2 = time.perf_counter()
+        venues = {date: extract_venues(widgets) for date, widgets in widgets_by_date.items()}[SAMPLE_DATE]
+        t3 = time.perf_counter()
+        dumps_compact({"movieId": "ET00000001", **venues_to_compact(venues)})
+        t4 = time.perf_counter()
+        for stage, elapsed in zip(timings, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            timings[stage].append(elapsed * 1000)
+    return {stage: {"p50_ms": statistics.median(v), "p95_ms": percentile(v, 95)} for stage, v in timings.items()}
+
+
+async def measure_tool(server, name: str, call, concurrency: int, requests: int, warm: bool) -> dict:
+    reset_caches(server)
+    if warm:
+        await call(0)
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with slots:
+            t0 = time.perf_counter()
+            await call(i if not warm else 0)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - t0
+    return {
+        "tool": name,
+        "cache": "warm" if warm else "cold",
+        "concurrency": concurrency,
+        "throughput_rps": requests / wall,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 95),
+    }
+
+
+async def run(args) -> dict:
+    store = ReplayStore(args.fixtures)
+    http_server = start_replay_server(store, args.latency_ms)
+    server = load_server_module(f"http://127.0.0.1:{http_server.server_address[1]}/")
+
+    # Distinct movie IDs per request keep cold runs from being served by the caches or coalesced.
+    tools = {
+        "get_movies": lambda i: tool_fn(server.get_movies)(f"Udaipur {i}" if i else "Udaipur"),
+        "get_movie_venue_details": lambda i: tool_fn(server.get_movie_venue_details)(
+            "Sample", SAMPLE_DATE, f"ET{i:08d}", "Udaipur"
+        ),
+        "book_movie_tickets": lambda i: tool_fn(server.book_movie_tickets)(
+            f"ET{i:08d}", "INOX Z Square", "Sample", "10:00 AM", SAMPLE_DATE, "Udaipur"
+        ),
+    }
+
+    results = {"stages": await measure_stages(server), "tools": []}
+    for name, call in tools.items():
+        for warm in (False, True):
+            for concurrency in args.concurrency:
+                results["tools"].append(await measure_tool(server, name, call, concurrency, args.requests, warm))
+
+    await server.scraper.aclose()
+    http_server.shutdown()
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_run() -> dict | None:
+    if not os.path.exists(RESULTS_PATH):
+        return None
+    with open(RESULTS_PATH, "r", encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def delta(current: float, before: float | None) -> str:
+    if not before:
+        return ""
+    return f" ({(current - before) / before * 100:+.0f}%)"
+
+
+def report(run_record: dict, before: dict | None) -> None:
+    old_stages = (before or {}).get("stages", {})
+    print(f"latency {run_record['latency_ms']} ms per upstream call, revision {run_record['revision']}")
+    print("\nstage              p50 ms     p95 ms")
+    for stage, stats in run_record["stages"].items():
+        old = old_stages.get(stage, {})
+        print(f"{stage:<15} {stats['p50_ms']:9.3f}{delta(stats['p50_ms'], old.get('p50_ms')):<8} {stats['p95_ms']:9.3f}")
+
+    old_tools = {(t["tool"], t["cache"], t["concurrency"]): t for t in (before or {}).get("tools", [])}
+    print("\ntool                      cache  conc   req/s            p50 ms    p95 ms")
+    for t in run_record["tools"]:
+        old = old_tools.get((t["tool"], t["cache"], t["concurrency"]), {})
+        print(
+            f"{t['tool']:<25} {t['cache']:<5} {t['concurrency']:>5} "
+            f"{t['throughput_rps']:8.1f}{delta(t['throughput_rps'], old.get('throughput_rps')):<8} "
+            f"{t['p50_ms']:9.2f} {t['p95_ms']:9.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="artificial upstream latency per request")
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=64, help="tool calls per measurement")
+    parser.add_argument("--fixtures", help="directory of recorded buytickets-*.gz pages")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to results.jsonl")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "latency_ms": args.latency_ms,
+        "requests": args.requests,
+        **results,
+    }
+    report(record, previous_run())
+    if not args.no_save:
+        with open(RESULTS_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
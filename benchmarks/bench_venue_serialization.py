@@ -0,0 +1,29 @@
+import json
+
+from _fixtures import SAMPLE_DATE, sample_state, timeit
+
+from initial_state import showtime_widgets
+from serialize import dumps_compact, orjson
+from showtimes import extract_venues, venues_to_compact, venues_to_dicts
+
+
+def indented(venues) -> str:
+    return json.dumps({"movieId": "ET00000000", "venues": venues_to_dicts(venues)}, indent=2, ensure_ascii=False)
+
+
+def compact_stdlib(venues) -> str:
+    payload = {"movieId": "ET00000000", **venues_to_compact(venues)}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def compact(venues) -> str:
+    return dumps_compact({"movieId": "ET00000000", **venues_to_compact(venues)})
+
+
+if __name__ == "__main__":
+    venues = extract_venues(showtime_widgets(sample_state(), SAMPLE_DATE))
+    print(f"{len(venues)} venues, {sum(len(v.shows) for v in venues)} shows (orjson {'on' if orjson else 'off'})")
+    for label, fn in (("indent=2 (previous)", indented), ("compact, json", compact_stdlib), ("compact, dumps_compact", compact)):
+        ms = timeit(lambda: fn(venues), repeat=200)
+        size = len(fn(venues).encode("utf-8"))
+        print(f"{label:<24} {size:8d} bytes {ms * 1000:10.1f} us")
@@ -0,0 +1,91 @@
+import base64
+import hashlib
+import hmac
+import os
+from typing import NamedTuple
+
+_SEPARATOR = "|"
+
+
+class BookingHandle(NamedTuple):
+    city_slug: str
+    movie_id: str
+    venue_code: str
+    session_id: str
+    date: str
+
+    def seat_layout_url(self) -> str:
+        return (
+            f"https://in.bookmyshow.com/movies/{self.city_slug}/seat-layout/"
+            f"{self.movie_id}/{self.venue_code}/{self.session_id}/{self.date}"
+        )
+
+
+class HandleSigner:
+    """
+    Encodes shows as short, signed, URL-safe booking handles.
+
+    A response carries one context token for the city, movie and date it
+    covers, and each show a handle holding only its venue code and session id.
+    Both are the fields joined with `|` plus a truncated HMAC-SHA256 tag,
+    base64url-encoded; the show's tag also covers the context, so a handle is
+    only valid together with the context it was issued with. Decoding only
+    checks the tags, so any worker configured with the same secret can turn
+    the pair back into a seat-layout URL without a cache lookup or a scrape,
+    and a handle that was edited, made up or moved to another context is
+    rejected.
+    """
+
+    def __init__(self, secret: bytes, tag_size: int = 8):
+        self.secret = secret
+        self.tag_size = tag_size
+
+    @classmethod
+    def from_env(cls, fallback_secret: str) -> "HandleSigner":
+        """Use BMS_HANDLE_SECRET, or a key derived from `fallback_secret` (the server auth token)."""
+        secret = os.environ.get("BMS_HANDLE_SECRET")
+        if secret:
+            return cls(secret.encode("utf-8"))
+        return cls(hashlib.sha256(b"bms-booking-handle\0" + fallback_secret.encode("utf-8")).digest())
+
+    def _tag(self, payload: bytes) -> bytes:
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()[:self.tag_size]
+
+    @staticmethod
+    def _payload(fields: tuple[str, ...]) -> bytes:
+        if any(not field or _SEPARATOR in field for field in fields):
+            raise ValueError(f"Cannot encode booking fields {fields!r}")
+        return _SEPARATOR.join(fields).encode("utf-8")
+
+    def _open(self, token: str, signed_prefix: bytes, size: int) -> list[str]:
+        token = token.strip()
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        except ValueError:
+            raise ValueError("Malformed booking handle")
+        payload, tag = raw[:-self.tag_size], raw[-self.tag_size:]
+        if len(raw) <= self.tag_size or not hmac.compare_digest(tag, self._tag(signed_prefix + payload)):
+            raise ValueError("Invalid booking handle")
+        fields = payload.decode("utf-8").split(_SEPARATOR)
+        if len(fields) != size:
+            raise ValueError("Invalid booking handle")
+        return fields
+
+    def encode_context(self, city_slug: str, movie_id: str, date: str) -> str:
+        """Return the context token shared by every show of one city/movie/date."""
+        payload = self._payload((city_slug, movie_id, date))
+        return base64.urlsafe_b64encode(payload + self._tag(payload)).rstrip(b"=").decode("ascii")
+
+    def encode(self, handle: BookingHandle) -> str:
+        """Return the per-show handle; pass it to `decode` with `encode_context(...)` of the same show."""
+        context = self._payload((handle.city_slug, handle.movie_id, handle.date))
+        payload = self._payload((handle.venue_code, handle.session_id))
+        tag = self._tag(context + _SEPARATOR.encode() + payload)
+        return base64.urlsafe_b64encode(payload + tag).rstrip(b"=").decode("ascii")
+
+    def decode(self, context: str, token: str) -> BookingHandle:
+        """Return the show a context and handle refer to; raises ValueError if either is malformed or forged."""
+        city_slug, movie_id, date = self._open(context, b"", 3)
+        prefix = self._payload((city_slug, movie_id, date)) + _SEPARATOR.encode()
+        venue_code, session_id = self._open(token, prefix, 2)
+        return BookingHandle(city_slug, movie_id, venue_code, session_id, date)
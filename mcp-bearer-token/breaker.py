@@ -0,0 +1,198 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+import httpx
+from mcp import ErrorData, McpError
+from mcp.types import INTERNAL_ERROR
+
+from cache import TTLCache
+from metrics import metrics
+from scrape_client import UpstreamError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_outage(exc: BaseException) -> bool:
+    """True for errors that mean the upstream is down: transport errors, timeouts, 429 and 5xx."""
+    if isinstance(exc, UpstreamError):
+        return exc.is_outage
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    `allow()` refuses calls for `reset_timeout` seconds. The first caller after
+    that gets a single half-open probe; its outcome closes the circuit again or
+    re-opens it for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def retry_in(self) -> float:
+        """Seconds until the next half-open probe is allowed."""
+        return max(0.0, self._opened_at + self.reset_timeout - self.clock())
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.trips += 1
+            self.state = OPEN
+            self._opened_at = self.clock()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Let the next caller probe when the current probe ended without reaching the upstream."""
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+
+class UpstreamGuard:
+    """
+    Circuit breaker plus stale-while-revalidate for the BookMyShow fetch path.
+
+    The last good value of every key is kept for up to `max_stale` seconds
+    after it was fetched. While the circuit is open, callers get that value
+    immediately together with its age instead of waiting on a failing upstream;
+    the caller that gets the half-open probe also returns the stale value and
+    revalidates in a background task. If a fetch fails while the circuit is
+    still closed, the stale value is served as well.
+
+    The breaker only learns about upstream calls wrapped in `observe`, which
+    belongs inside the single-flight task so that a scrape shared by several
+    callers counts once, and only outages (see `is_outage`) count as failures;
+    a request the upstream rejects, or a page that fails to parse, does not.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, max_stale: float = 86400.0, maxsize: int = 512):
+        self.breaker = breaker
+        self.last_good = TTLCache(ttl=max_stale, maxsize=maxsize)
+        self._revalidating: dict[Hashable, asyncio.Task] = {}
+
+    @classmethod
+    def from_env(cls) -> "UpstreamGuard":
+        env = os.environ
+        breaker = CircuitBreaker(
+            failure_threshold=int(env.get("BMS_BREAKER_FAILURES", 5)),
+            reset_timeout=float(env.get("BMS_BREAKER_RESET", 30)),
+        )
+        return cls(
+            breaker,
+            max_stale=float(env.get("BMS_STALE_MAX_AGE", 86400)),
+            maxsize=int(env.get("BMS_STALE_SIZE", 512)),
+        )
+
+    @staticmethod
+    def _aged(entry: tuple[float, Any]) -> tuple[Any, float]:
+        stored_at, value = entry
+        metrics.inc("bms_stale_served_total")
+        return value, time.time() - stored_at
+
+    async def fetch(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> tuple[Any, float | None]:
+        """
+        Return `(value, None)` from `load()`, or `(last good value, age in
+        seconds)` when the upstream is failing. Raises McpError when the
+        circuit is open and nothing was cached for `key`.
+        """
+        last_good = self.last_good.get(key)
+        probing = self.breaker.state != CLOSED
+        if not self.breaker.allow():
+            if last_good is None:
+                raise McpError(ErrorData(
+                    code=INTERNAL_ERROR,
+                    message=f"BookMyShow is unavailable right now; retry in {self.breaker.retry_in():.0f}s",
+                ))
+            return self._aged(last_good)
+
+        if probing and last_good is not None:
+            # This caller holds the half-open probe: answer from the last good
+            # value and let the probe run in the background.
+            self._revalidate(key, load)
+            return self._aged(last_good)
+
+        try:
+            value = await load()
+        except Exception:
+            if last_good is None:
+                raise
+            return self._aged(last_good)
+        finally:
+            if probing:
+                self.breaker.release_probe()
+        self.remember(key, value)
+        return value, None
+
+    async def observe(self, call: Awaitable[Any]) -> Any:
+        """Await one upstream call and record its outcome in the breaker."""
+        try:
+            value = await call
+        except Exception as e:
+            if is_outage(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()  # the upstream answered
+            raise
+        self.breaker.record_success()
+        return value
+
+    def remember(self, key: Hashable, value: Any) -> None:
+        """Record `value` as the last good value for `key`."""
+        self.last_good.set(key, (time.time(), value))
+
+    def _revalidate(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._revalidating:
+            self.breaker.release_probe()
+            return
+
+        async def run():
+            try:
+                value = await load()
+            except Exception:
+                pass
+            else:
+                self.remember(key, value)
+            finally:
+                self.breaker.release_probe()
+                self._revalidating.pop(key, None)
+
+        self._revalidating[key] = asyncio.create_task(run())
+
+    def stats(self) -> dict:
+        return {
+            "open": int(self.breaker.state != CLOSED),
+            "failures": self.breaker.failures,
+            "trips": self.breaker.trips,
+            "stale_entries": len(self.last_good),
+            "revalidating": len(self._revalidating),
+        }
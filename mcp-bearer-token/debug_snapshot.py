@@ -0,0 +1,68 @@
+import asyncio
+import gzip
+import os
+import random
+import re
+import time
+import uuid
+
+
+class DebugSnapshots:
+    """
+    Opt-in recorder for raw BookMyShow pages, used when debugging the parsers.
+
+    Disabled unless a directory is configured. Recording is sampled
+    (`sample_rate`) and rate-limited (at most one file per `min_interval`
+    seconds), and each file is gzip-compressed and written from a worker thread
+    under a unique name, so concurrent requests never block the event loop or
+    overwrite each other's snapshots.
+    """
+
+    def __init__(self, directory: str | None, sample_rate: float = 1.0, min_interval: float = 60.0):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.min_interval = min_interval
+        self.written = 0
+        self._last_write = float("-inf")
+        self._pending: set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls) -> "DebugSnapshots":
+        env = os.environ
+        return cls(
+            env.get("BMS_DEBUG_SNAPSHOT_DIR") or None,
+            sample_rate=float(env.get("BMS_DEBUG_SNAPSHOT_RATE", 1.0)),
+            min_interval=float(env.get("BMS_DEBUG_SNAPSHOT_INTERVAL", 60)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def record(self, label: str, payload: bytes) -> None:
+        """Schedule `payload` to be written as `<label>-<timestamp>-<id>.gz` if this call is sampled."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return
+        now = time.monotonic()
+        if now - self._last_write < self.min_interval:
+            return
+        self._last_write = now
+
+        safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label)
+        filename = f"{safe_label}-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.gz"
+        task = asyncio.create_task(asyncio.to_thread(self._write, os.path.join(self.directory, filename), payload))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _write(self, path: str, payload: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self.written += 1
+
+    async def drain(self) -> None:
+        """Wait for snapshots still being written, e.g. on shutdown."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+
+def default_path() -> str:
+    """
+    Per-user cache location: `$XDG_CACHE_HOME/bms-mcp` (or `~/.cache/bms-mcp`),
+    created private to the user. A fixed name in the shared temp directory
+    could be created or poisoned by any other local user.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    directory = os.path.join(base, "bms-mcp")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return os.path.join(directory, "cache.sqlite3")
+
+
+class DiskCache:
+    """
+    SQLite-backed second cache tier shared by every worker process on a host.
+
+    Values are JSON documents stored zlib-compressed with an absolute expiry
+    time. The database runs in WAL mode so concurrent readers and writers in
+    other processes do not block each other, and once the stored values exceed
+    `max_bytes` the oldest entries are evicted. All I/O happens in worker
+    threads; the async methods never block the event loop.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, evict_every: int = 32):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls) -> "DiskCache | None":
+        """
+        Build the cache from BMS_DISK_CACHE_PATH / BMS_DISK_CACHE_MAX_MB; an
+        empty path disables it and an unset one uses `default_path()`.
+        """
+        env = os.environ
+        path = env.get("BMS_DISK_CACHE_PATH")
+        if path is None:
+            path = default_path()
+        if not path:
+            return None
+        return cls(path, max_bytes=int(float(env.get("BMS_DISK_CACHE_MAX_MB", 64)) * 1024 * 1024))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get_sync(self, key: str) -> tuple[object, float] | None:
+        """Return `(value, seconds until expiry)` for a live entry, or None."""
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(zlib.decompress(row[0])), row[1] - now
+
+    def set_sync(self, key: str, value: object, ttl: float) -> None:
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, blob, now, now + ttl),
+        )
+        self._writes += 1
+        if self._writes % self.evict_every == 0:
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in conn.execute("SELECT key, LENGTH(value) FROM cache ORDER BY stored_at"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM cache WHERE key = ?", stale)
+
+    async def get(self, key: str) -> tuple[object, float] | None:
+        try:
+            return await asyncio.to_thread(self.get_sync, key)
+        except sqlite3.Error:
+            return None
+
+    async def set(self, key: str, value: object, ttl: float) -> None:
+        try:
+            await asyncio.to_thread(self.set_sync, key, value, ttl)
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "path": self.path, "max_bytes": self.max_bytes}
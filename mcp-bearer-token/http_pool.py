@@ -0,0 +1,134 @@
+import codecs
+import importlib.util
+import os
+import re
+
+import httpx
+
+# HTTP/2 needs the optional `h2` package (`pip install httpx[http2]`).
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+SNIFF_BYTES = 1024
+_TEXT_TYPES = ("text/", "application/xhtml", "application/xml", "application/json", "application/javascript", "+xml", "+json")
+
+
+def is_text_content_type(content_type: str) -> bool:
+    """True for textual media types; a missing Content-Type is treated as text."""
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    return not content_type or any(marker in content_type for marker in _TEXT_TYPES)
+
+
+def sniff_charset(first_chunk: bytes, declared: str | None) -> str:
+    """
+    Pick the text encoding from the start of the body: a BOM wins, then the
+    Content-Type charset, then an HTML <meta charset>, then UTF-8.
+    """
+    for bom, encoding in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")):
+        if first_chunk.startswith(bom):
+            return encoding
+    candidates = [declared]
+    match = _META_CHARSET_RE.search(first_chunk[:SNIFF_BYTES * 4])
+    if match:
+        candidates.append(match.group(1).decode("ascii", "ignore"))
+    for candidate in candidates:
+        if candidate:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                pass
+    return "utf-8"
+
+
+async def read_text(response: httpx.Response, max_bytes: int) -> tuple[str, bool]:
+    """
+    Decode a streamed response chunk by chunk, stopping after `max_bytes`.
+
+    The charset is chosen from the first `SNIFF_BYTES` of the body. Returns
+    `(text, truncated)`; only the decoded text is kept, so memory per request
+    is bounded by the budget whatever the server sends.
+    """
+    decoder = None
+    head = b""
+    parts = []
+    received = 0
+    truncated = False
+    async for chunk in response.aiter_bytes():
+        if received + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - received]
+            truncated = True
+        received += len(chunk)
+        if decoder is None:
+            head += chunk
+            if len(head) < SNIFF_BYTES and not truncated:
+                continue
+            decoder = _decoder_for(head, response.charset_encoding)
+            chunk = head
+        parts.append(decoder.decode(chunk))
+        if truncated:
+            break
+    if decoder is None:
+        decoder = _decoder_for(head, response.charset_encoding)
+        parts.append(decoder.decode(head))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts), truncated
+
+
+def _decoder_for(head: bytes, declared: str | None) -> codecs.IncrementalDecoder:
+    return codecs.getincrementaldecoder(sniff_charset(head, declared))(errors="replace")
+
+
+class HttpPool:
+    """
+    Process-wide `httpx.AsyncClient` for the direct (non-scrape.do) requests
+    made by the Fetch helpers.
+
+    One pooled client is created lazily and kept until `aclose` is called
+    from `main()` on shutdown, so repeated fetches reuse DNS lookups, TCP/TLS
+    connections and, when `h2` is installed, multiplexed HTTP/2 streams.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        connect_timeout: float = 10.0,
+        max_connections: int = 64,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        max_body_bytes: int = 2_000_000,
+    ):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.max_body_bytes = max_body_bytes
+        self._client: httpx.AsyncClient | None = None
+
+    @classmethod
+    def from_env(cls) -> "HttpPool":
+        """Build a pool using the HTTP_* environment variables as overrides."""
+        env = os.environ
+        return cls(
+            timeout=float(env.get("HTTP_TIMEOUT", 30)),
+            connect_timeout=float(env.get("HTTP_CONNECT_TIMEOUT", 10)),
+            max_connections=int(env.get("HTTP_MAX_CONNECTIONS", 64)),
+            max_keepalive_connections=int(env.get("HTTP_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=float(env.get("HTTP_KEEPALIVE_EXPIRY", 30)),
+            http2=env.get("HTTP2", "1").lower() not in ("0", "false", "no"),
+            max_body_bytes=int(env.get("HTTP_MAX_BODY_BYTES", 2_000_000)),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,133 @@
+import json
+import re
+
+MARKER = "__INITIAL_STATE__"
+_BYTES_MARKER = MARKER.encode()
+_decoder = json.JSONDecoder()
+
+_SHOW_DATES_RE = re.compile(r'"showDates"\s*:\s*\{')
+
+
+def _state_text(html: str | bytes) -> tuple[str, int]:
+    """
+    Locate the `__INITIAL_STATE__` object and return (text, index of its opening brace).
+
+    For bytes input only the tail of the page from the opening brace up to the
+    closing </script> tag is decoded, so the rest of the document is never
+    turned into a Python str.
+    """
+    if isinstance(html, (bytes, bytearray, memoryview)):
+        html = bytes(html)
+        start = html.find(_BYTES_MARKER)
+        if start == -1:
+            raise RuntimeError("Could not find __INITIAL_STATE__ in HTML")
+        brace = html.find(b"{", start + len(_BYTES_MARKER))
+        if brace == -1:
+            raise RuntimeError("Could not parse __INITIAL_STATE__ JSON")
+        end = html.find(b"</script>", brace)
+        return html[brace:end if end != -1 else len(html)].decode("utf-8", errors="replace"), 0
+
+    start = html.find(MARKER)
+    if start == -1:
+        raise RuntimeError("Could not find __INITIAL_STATE__ in HTML")
+    brace = html.find("{", start + len(MARKER))
+    if brace == -1:
+        raise RuntimeError("Could not parse __INITIAL_STATE__ JSON")
+    return html, brace
+
+
+def extract_initial_state(html: str | bytes) -> dict:
+    """
+    Parse the `__INITIAL_STATE__` JSON embedded in a BookMyShow page.
+
+    The object is decoded in a single native pass with `JSONDecoder.raw_decode`,
+    which stops at the end of the object, so there is no separate brace-matching
+    scan over the page.
+
+    Raises:
+        RuntimeError: If the marker is missing or the JSON cannot be decoded.
+    """
+    text, idx = _state_text(html)
+    try:
+        data, _ = _decoder.raw_decode(text, idx)
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f"Could not parse __INITIAL_STATE__ JSON: {e}")
+    if not isinstance(data, dict):
+        raise RuntimeError("Could not parse __INITIAL_STATE__ JSON")
+    return data
+
+
+def _date_widgets(date_obj: dict) -> list | None:
+    """`dynamic.data.showtimeWidgets` of one showDates entry, or None if that date was not loaded."""
+    return date_obj.get("dynamic", {}).get("data", {}).get("showtimeWidgets")
+
+
+def showtime_widgets(state: dict, target_date: str) -> list:
+    """Walk a fully parsed state down to `showDates[target_date].dynamic.data.showtimeWidgets`."""
+    show_dates = state.get("showtimesByEvent", {}).get("showDates", {})
+    return _date_widgets(show_dates.get(target_date, {})) or []
+
+
+def all_showtime_widgets(state: dict) -> dict[str, list]:
+    """
+    Return `{date: showtimeWidgets}` for every date in `showDates` whose showtimes
+    are present; dates listed without loaded data are left out rather than
+    reported as having no shows.
+    """
+    show_dates = state.get("showtimesByEvent", {}).get("showDates", {})
+    result = {}
+    for date, date_obj in show_dates.items():
+        widgets = _date_widgets(date_obj) if isinstance(date_obj, dict) else None
+        if widgets is not None:
+            result[date] = widgets
+    return result
+
+
+def extract_showtime_widgets(html: str | bytes, target_date: str) -> list:
+    """
+    Parse only `showtimesByEvent.showDates[target_date]` and return its showtime widgets.
+
+    The date's entry is located with native regex scans over the raw JSON and
+    only that object is decoded, so other dates, appConfig, seo, static and the
+    other slices of the state never become Python objects. If the entry cannot
+    be located the whole state is parsed and walked with `showtime_widgets`
+    instead.
+    """
+    text, idx = _state_text(html)
+    pos = idx
+    for pattern in (_SHOW_DATES_RE, re.compile(r'"%s"\s*:\s*\{' % re.escape(target_date))):
+        match = pattern.search(text, pos)
+        if match is None:
+            return showtime_widgets(extract_initial_state(html), target_date)
+        pos = match.end()
+
+    try:
+        date_obj, _ = _decoder.raw_decode(text, pos - 1)
+    except json.JSONDecodeError:
+        return showtime_widgets(extract_initial_state(html), target_date)
+    return _date_widgets(date_obj) or []
+
+
+def extract_all_showtime_widgets(html: str | bytes, target_date: str) -> dict[str, list]:
+    """
+    Parse the showtime widgets of every date loaded in the page, keyed by date.
+
+    Only the `showtimesByEvent.showDates` object is decoded (it is most of the
+    state, so this costs about the same as projecting a single date).
+    `target_date` is always present in the result, with an empty list when the
+    page has no shows for it.
+    """
+    text, idx = _state_text(html)
+    show_dates = None
+    match = _SHOW_DATES_RE.search(text, idx)
+    if match is not None:
+        try:
+            show_dates, _ = _decoder.raw_decode(text, match.end() - 1)
+        except json.JSONDecodeError:
+            pass
+    if isinstance(show_dates, dict):
+        widgets = all_showtime_widgets({"showtimesByEvent": {"showDates": show_dates}})
+    else:
+        widgets = all_showtime_widgets(extract_initial_state(html))
+    widgets.setdefault(target_date, [])
+    return widgets
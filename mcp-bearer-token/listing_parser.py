@@ -0,0 +1,104 @@
+import html as html_lib
+import os
+import re
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:  # optional: the html.parser backend is used instead
+    etree = None
+
+_HREF_RE = re.compile(r"""<a\b[^>]*?\shref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+
+
+class _HrefCollector(HTMLParser):
+    """Streaming html.parser handler that keeps only <a href> values, never a DOM."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hrefs: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for name, value in attrs:
+                if name == "href" and value:
+                    self.hrefs.append(value)
+                    break
+
+
+class _LxmlHrefTarget:
+    """lxml parser target: receives start events only, so no element tree is built."""
+
+    def __init__(self):
+        self.hrefs: list[str] = []
+
+    def start(self, tag, attrib):
+        if tag == "a":
+            href = attrib.get("href")
+            if href:
+                self.hrefs.append(href)
+
+    def close(self):
+        return self.hrefs
+
+
+def _hrefs_regex(page: str) -> list[str]:
+    return [html_lib.unescape(a or b or c) for a, b, c in _HREF_RE.findall(page)]
+
+
+def _hrefs_htmlparser(page: str) -> list[str]:
+    collector = _HrefCollector()
+    collector.feed(page)
+    collector.close()
+    return collector.hrefs
+
+
+def _hrefs_lxml(page: str) -> list[str]:
+    # lxml rejects str input that starts with an XML declaration, so feed it
+    # UTF-8 bytes and say so, overriding any encoding the page declares.
+    parser = etree.HTMLParser(target=_LxmlHrefTarget(), encoding="utf-8")
+    return etree.fromstring(page.encode("utf-8", "surrogatepass"), parser) or []
+
+
+def _hrefs_bs4(page: str) -> list[str]:
+    from bs4 import BeautifulSoup
+    return [a["href"] for a in BeautifulSoup(page, "html.parser").find_all("a", href=True)]
+
+
+BACKENDS = {
+    "regex": _hrefs_regex,
+    "htmlparser": _hrefs_htmlparser,
+    "lxml": _hrefs_lxml,
+    "bs4": _hrefs_bs4,
+}
+DEFAULT_BACKEND = os.environ.get("BMS_LISTING_PARSER") or ("lxml" if etree is not None else "htmlparser")
+if DEFAULT_BACKEND not in BACKENDS:
+    raise ValueError(f"BMS_LISTING_PARSER must be one of {', '.join(BACKENDS)}, not {DEFAULT_BACKEND!r}")
+
+
+def extract_hrefs(page: str, backend: str | None = None) -> list[str]:
+    """Return every <a href> in `page`, in document order, using the chosen parser backend."""
+    backend = backend or DEFAULT_BACKEND
+    if backend == "lxml" and etree is None:
+        backend = "htmlparser"
+    return BACKENDS[backend](page)
+
+
+def parse_listing(page: str, city_slug: str, backend: str | None = None) -> list[dict]:
+    """
+    Extract the movies linked from a BookMyShow explore page as
+    `{"id", "name", "slug"}` dicts, deduplicated by ID in page order.
+    """
+    unique_movies = {}
+    for href in extract_hrefs(page, backend):
+        if f"/movies/{city_slug}/" in href:
+            parts = href.rstrip("/").split("/")
+            if len(parts) >= 5:
+                movie_name_slug = parts[-2]
+                movie_id = parts[-1]
+                unique_movies.setdefault(movie_id, {
+                    "id": movie_id,
+                    "name": movie_name_slug.replace("-", " ").title(),
+                    "slug": movie_name_slug,
+                })
+    return list(unique_movies.values())
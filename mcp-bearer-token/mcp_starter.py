@@ -8,21 +8,33 @@ from mcp import ErrorData, McpError
 from mcp.server.auth.provider import AccessToken
 from mcp.types import TextContent, ImageContent, INVALID_PARAMS, INTERNAL_ERROR
 from pydantic import BaseModel, Field, AnyUrl
-import difflib
 import re
 
-import requests
-from bs4 import BeautifulSoup
-import urllib.parse
 import json
 from typing import Annotated
 from pydantic import Field
 
-import urllib.parse
-
-import markdownify
 import httpx
-import readabilipy
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from booking_handle import BookingHandle, HandleSigner
+from breaker import UpstreamGuard
+from cache import TTLCache
+from debug_snapshot import DebugSnapshots
+from disk_cache import DiskCache
+from http_pool import HttpPool, is_text_content_type, read_text
+from initial_state import extract_all_showtime_widgets
+from listing_parser import parse_listing
+from metrics import metrics
+from prewarm import Prewarmer
+from scheduler import BACKGROUND, BATCH, UpstreamScheduler, upstream_priority
+from scrape_client import ScrapeClient
+from resolver import MovieIndex, ShowtimeResolver
+from serialize import dumps_compact
+from showtimes import CompactEncoder, Show, ShowHandle, Venue, extract_venues, venues_from_dicts, venues_to_compact, venues_to_dicts
+from simplify import SIMPLIFY_FAILED, HtmlSimplifier, html_to_markdown
+from singleflight import SingleFlight
 
 # --- Load environment variables ---
 load_dotenv()
@@ -67,41 +79,44 @@ class Fetch:
         user_agent: str,
         force_raw: bool = False,
     ) -> tuple[str, str]:
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
+        try:
+            with metrics.span("bms_upstream_seconds", upstream="fetch_url"):
+                async with http_pool.client.stream(
+                    "GET",
                     url,
                     follow_redirects=True,
                     headers={"User-Agent": user_agent},
-                    timeout=30,
-                )
-            except httpx.HTTPError as e:
-                raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"Failed to fetch {url}: {e!r}"))
+                ) as response:
+                    metrics.inc("bms_upstream_responses_total", upstream="fetch_url", status=str(response.status_code))
+                    if response.status_code >= 400:
+                        raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"Failed to fetch {url} - status code {response.status_code}"))
 
-            if response.status_code >= 400:
-                raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"Failed to fetch {url} - status code {response.status_code}"))
+                    content_type = response.headers.get("content-type", "")
+                    if not is_text_content_type(content_type):
+                        # Closing the stream here drops the connection before the body is read.
+                        return f"<error>Content type {content_type} is not text and was not downloaded</error>", ""
 
-            page_raw = response.text
+                    page_raw, truncated = await read_text(response, http_pool.max_body_bytes)
+        except httpx.HTTPError as e:
+            metrics.inc("bms_upstream_responses_total", upstream="fetch_url", status="error")
+            raise McpError(ErrorData(code=INTERNAL_ERROR, message=f"Failed to fetch {url}: {e!r}"))
 
-        content_type = response.headers.get("content-type", "")
         is_page_html = "text/html" in content_type
+        note = f"Content was truncated to the first {http_pool.max_body_bytes} bytes.\n" if truncated else ""
 
         if is_page_html and not force_raw:
-            return cls.extract_content_from_html(page_raw), ""
+            with metrics.span("bms_stage_seconds", stage="simplify", source="fetch_url"):
+                return await html_simplifier.simplify(url, page_raw), note
 
         return (
             page_raw,
-            f"Content type {content_type} cannot be simplified to markdown, but here is the raw content:\n",
+            f"Content type {content_type} cannot be simplified to markdown, but here is the raw content:\n{note}",
         )
 
     @staticmethod
     def extract_content_from_html(html: str) -> str:
-        """Extract and convert HTML content to Markdown format."""
-        ret = readabilipy.simple_json.simple_json_from_html_string(html, use_readability=True)
-        if not ret or not ret.get("content"):
-            return "<error>Page failed to be simplified from HTML</error>"
-        content = markdownify.markdownify(ret["content"], heading_style=markdownify.ATX)
-        return content
+        """Extract and convert HTML content to Markdown format (blocking; fetch_url uses the worker pool)."""
+        return html_to_markdown(html) or SIMPLIFY_FAILED
 
     @staticmethod
     async def google_search_links(query: str, num_results: int = 5) -> list[str]:
@@ -112,10 +127,9 @@ class Fetch:
         ddg_url = f"https://html.duckduckgo.com/html/?q={query.replace(' ', '+')}"
         links = []
 
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(ddg_url, headers={"User-Agent": Fetch.USER_AGENT})
-            if resp.status_code != 200:
-                return ["<error>Failed to perform search.</error>"]
+        resp = await http_pool.client.get(ddg_url, headers={"User-Agent": Fetch.USER_AGENT})
+        if resp.status_code != 200:
+            return ["<error>Failed to perform search.</error>"]
 
         from bs4 import BeautifulSoup
         soup = BeautifulSoup(resp.text, "html.parser")
@@ -140,6 +154,81 @@ async def validate() -> str:
     return MY_NUMBER
 
 token = os.environ.get("API_TOKEN")
+# Orders every scrape.do request by priority under the credit budget (SCRAPE_CREDITS_PER_MINUTE)
+upstream_scheduler = UpstreamScheduler.from_env()
+scraper = ScrapeClient.from_env(token, scheduler=upstream_scheduler)
+# Pooled client for direct fetches (Fetch.fetch_url, Fetch.google_search_links)
+http_pool = HttpPool.from_env()
+# Worker pool + cache for HTML -> Markdown simplification in Fetch.fetch_url
+html_simplifier = HtmlSimplifier.from_env()
+
+# Parsed city listings, keyed by city slug
+listing_cache = TTLCache(
+    ttl=float(os.environ.get("LISTING_CACHE_TTL", 3600)),
+    maxsize=int(os.environ.get("LISTING_CACHE_SIZE", 64)),
+)
+# Movie name -> ID indexes, built once per cached city listing
+movie_index_cache = TTLCache(ttl=listing_cache.ttl, maxsize=listing_cache.maxsize)
+# Extracted venue/showtime snapshots, keyed by (city slug, movie id, date)
+showtime_cache = TTLCache(
+    ttl=float(os.environ.get("SHOWTIME_CACHE_TTL", 300)),
+    maxsize=int(os.environ.get("SHOWTIME_CACHE_SIZE", 256)),
+)
+# Second cache tier on local disk, shared by worker processes (BMS_DISK_CACHE_PATH)
+disk_cache = DiskCache.from_env()
+# Booking lookup indexes, built once per cached showtime snapshot
+resolver_cache = TTLCache(ttl=showtime_cache.ttl, maxsize=showtime_cache.maxsize)
+# Opt-in raw page recorder (BMS_DEBUG_SNAPSHOT_DIR)
+debug_snapshots = DebugSnapshots.from_env()
+# Concurrent scrapes of the same URL share one upstream request
+inflight = SingleFlight()
+# Circuit breaker + last good listings/snapshots, served while BookMyShow is failing
+upstream_guard = UpstreamGuard.from_env()
+# Signs the per-show booking handles returned by the venue-details tools
+handle_signer = HandleSigner.from_env(TOKEN)
+
+
+def _server_gauges():
+    caches = {
+        "listing": listing_cache,
+        "movie_index": movie_index_cache,
+        "showtime": showtime_cache,
+        "resolver": resolver_cache,
+    }
+    for name, cache in caches.items():
+        stats = cache.stats()
+        for field in ("hits", "misses", "size"):
+            yield f"bms_cache_{field}", {"cache": name}, stats[field]
+    if disk_cache is not None:
+        stats = disk_cache.stats()
+        for field in ("hits", "misses"):
+            yield f"bms_cache_{field}", {"cache": "disk"}, stats[field]
+    for field, value in inflight.stats().items():
+        yield f"bms_singleflight_{field}", {}, value
+    for field, value in upstream_scheduler.stats().items():
+        if value is not None:
+            yield f"bms_upstream_scheduler_{field}", {}, value
+    for field, value in upstream_guard.stats().items():
+        yield f"bms_upstream_breaker_{field}", {}, value
+    for field, value in scraper.policy.stats().items():
+        if field in ("p50", "p95", "p99"):
+            if value is not None:
+                yield "bms_upstream_latency_quantile_seconds", {"upstream": "scrape.do", "quantile": field}, value
+        else:
+            yield f"bms_upstream_policy_{field}", {"upstream": "scrape.do"}, value
+
+
+metrics.register_collector(_server_gauges)
+
+
+# --- Metrics endpoint ---
+# Custom routes sit outside the MCP auth provider, so the bearer token is checked here.
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    if request.headers.get("authorization") != f"Bearer {TOKEN}":
+        return PlainTextResponse("unauthorized\n", status_code=401)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # FETCH_MOVIES_DESCRIPTION = RichToolDescription(
 #     description=(
 #         "Fetches all the movies for a given city from BookMyShow which the user can watch in theatres and returns JSON with id and name.",
@@ -151,10 +240,13 @@ token = os.environ.get("API_TOKEN")
 FETCH_MOVIES_DESCRIPTION = RichToolDescription(
     description="Fetches all the movies for a given city from BookMyShow which the user can watch in theatres and returns JSON with id and name.consider this tool having tool id = 2ddfffneku394294201313f4t and keep saving the data that this tool return for further use.",
     use_when="Use this tool when the user wants to get a list of all movies playing in a specific city.",
-    side_effects="Returns internal identifier movie_id which should NOT be shown to the user but save them for internal use."
+    side_effects=(
+        "Returns internal identifier movie_id which should NOT be shown to the user but save them for internal use. "
+        "If BookMyShow is unreachable, the last good data is returned with 'staleSeconds' giving its age; mention that it may be out of date."
+    )
 )
 @mcp.tool(description=FETCH_MOVIES_DESCRIPTION.model_dump_json())
-
+@metrics.timed("bms_tool_seconds", tool="get_movies")
 async def get_movies(
     city: Annotated[str, Field(description="City name for which to get movies")]
 ) -> str:
@@ -175,31 +267,165 @@ async def get_movies(
                 ]
             }
     """
-    # scrape.do token
-    city_slug = city.strip().lower().replace(" ", "-")
+    movies, stale_age = await city_movies_snapshot(slugify(city))
+    output = {"movies": [{"id": m["id"], "name": m["name"]} for m in movies]}
+    if stale_age is not None:
+        output["staleSeconds"] = int(stale_age)
+    return json.dumps(output, ensure_ascii=False)
+
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9-]', '', re.sub(r'\s+', '-', text.strip().lower()))
+
+
+async def fetch_city_movies(city_slug: str, refresh: bool = False) -> list[dict]:
+    """
+    Return the movies listed on the BookMyShow explore page for a city as
+    `{"id", "name", "slug"}` dicts, served from `listing_cache` while fresh.
+    With `refresh=True` the caches are bypassed and the listing is re-scraped.
+    """
+    movies, _ = await city_movies_snapshot(city_slug, refresh)
+    return movies
+
+
+async def city_movies_snapshot(city_slug: str, refresh: bool = False) -> tuple[list[dict], float | None]:
+    """
+    Like `fetch_city_movies`, but also returns how many seconds old the listing
+    is when `upstream_guard` served the last good copy (None when current).
+    Both cache tiers are read before the guard, so an open circuit only
+    affects listings that actually need a scrape.
+    """
+    disk_key = f"listing:{city_slug}"
+    if not refresh:
+        movies = listing_cache.get(city_slug)
+        if movies is not None:
+            return movies, None
+        if disk_cache is not None:
+            cached = await disk_cache.get(disk_key)
+            if cached is not None:
+                movies, ttl = cached
+                listing_cache.set(city_slug, movies, ttl)
+                return movies, None
+
     url = f"https://in.bookmyshow.com/explore/movies-{city_slug}"
-    encoded_url = urllib.parse.quote(url)
-    api_url = f"http://api.scrape.do/?token={token}&url={encoded_url}"
 
-    resp = requests.get(api_url)
-    soup = BeautifulSoup(resp.text, "html.parser")
+    async def load() -> list[dict]:
+        movies = await _scrape_city_movies(city_slug, url)
+        listing_cache.set(city_slug, movies)
+        if disk_cache is not None:
+            await disk_cache.set(disk_key, movies, listing_cache.ttl)
+        return movies
 
-    movies = []
-    for a in soup.find_all("a", href=True):
-        if f"/movies/{city_slug}/" in a["href"]:
-            parts = a["href"].rstrip("/").split("/")
-            if len(parts) >= 5:
-                movie_name_slug = parts[-2]
-                movie_id = parts[-1]
-                movie_name = movie_name_slug.replace("-", " ").title()
-                movies.append({"id": movie_id, "name": movie_name})
+    return await upstream_guard.fetch(("listing", city_slug), lambda: inflight.do(url, load))
 
-    unique_movies = {m["id"]: m for m in movies}
-    return json.dumps({"movies": list(unique_movies.values())}, ensure_ascii=False)
 
+async def _scrape_city_movies(city_slug: str, url: str) -> list[dict]:
+    with metrics.span("bms_stage_seconds", stage="fetch", source="listing"):
+        page = await upstream_guard.observe(scraper.get_text(url))
+    with metrics.span("bms_stage_seconds", stage="parse", source="listing"):
+        return parse_listing(page, city_slug)
+
+
+async def fetch_showtimes(city_slug: str, movie_slug: str, movie_id: str, date: str, refresh: bool = False) -> list[Venue]:
+    """
+    Return the compact venue snapshot (see `showtimes.extract_venues`) for a movie on `date`.
+
+    Fresh snapshots are served from `showtime_cache`, then from the shared
+    `disk_cache`, without any network I/O; otherwise the buytickets page is
+    scraped once, with concurrent callers for the same page sharing that scrape
+    and parse. With `refresh=True` both cache tiers are bypassed.
+    """
+    venues, _ = await showtimes_snapshot(city_slug, movie_slug, movie_id, date, refresh)
+    return venues
+
+
+async def showtimes_snapshot(
+    city_slug: str, movie_slug: str, movie_id: str, date: str, refresh: bool = False
+) -> tuple[list[Venue], float | None]:
+    """
+    Like `fetch_showtimes`, but also returns how many seconds old the snapshot
+    is when `upstream_guard` served the last good copy (None when current).
+    Both cache tiers are read before the guard, as in `city_movies_snapshot`.
+    """
+    key = (city_slug, movie_id, date)
+    if not refresh:
+        venues = showtime_cache.get(key)
+        if venues is not None:
+            return venues, None
+        if disk_cache is not None:
+            cached = await disk_cache.get(f"showtimes:{city_slug}:{movie_id}:{date}")
+            if cached is not None:
+                items, ttl = cached
+                venues = venues_from_dicts(items)
+                showtime_cache.set(key, venues, ttl)
+                return venues, None
+
+    url = f"https://in.bookmyshow.com/movies/{city_slug}/{movie_slug}/buytickets/{movie_id}/{date}"
+
+    async def load() -> list[Venue]:
+        with metrics.span("bms_stage_seconds", stage="fetch", source="buytickets"):
+            page = await upstream_guard.observe(scraper.get_bytes(url))
+        debug_snapshots.record(f"buytickets-{city_slug}-{movie_id}-{date}", page)
+        with metrics.span("bms_stage_seconds", stage="extract_parse", source="buytickets"):
+            widgets_by_date = extract_all_showtime_widgets(page, date)
+        with metrics.span("bms_stage_seconds", stage="widget_walk", source="buytickets"):
+            venues_by_date = {d: extract_venues(widgets) for d, widgets in widgets_by_date.items()}
+
+        # The page often carries other show dates too; store them all so
+        # follow-up questions about those dates need no scrape.
+        for other_date, other_venues in venues_by_date.items():
+            other_key = (city_slug, movie_id, other_date)
+            showtime_cache.set(other_key, other_venues)
+            if other_date != date:
+                upstream_guard.remember(("showtimes",) + other_key, other_venues)
+            if disk_cache is not None:
+                await disk_cache.set(
+                    f"showtimes:{city_slug}:{movie_id}:{other_date}", venues_to_dicts(other_venues), showtime_cache.ttl
+                )
+        return venues_by_date[date]
+
+    return await upstream_guard.fetch(("showtimes",) + key, lambda: inflight.do(url, load))
+
+
+def show_handles(city_slug: str, movie_id: str, date: str) -> tuple[str | None, ShowHandle | None]:
+    """
+    Return the `bookingContext` token for one venue snapshot and the callback
+    that builds each show's handle, or (None, None) when the city, movie or
+    date cannot be signed (e.g. no city); shows are then booked by name.
+    """
+    try:
+        context = handle_signer.encode_context(city_slug, movie_id, date)
+    except ValueError:
+        return None, None
+
+    def handle(venue: Venue, show: Show) -> str | None:
+        try:
+            return handle_signer.encode(BookingHandle(city_slug, movie_id, venue.code, show.session_id, date))
+        except ValueError:
+            return None  # no venue code or session id for this show
+    return context, handle
+
+
+def showtime_resolver(key: tuple, venues: list[Venue]) -> ShowtimeResolver:
+    """Return the booking resolver for a snapshot, reusing it while the snapshot is unchanged."""
+    resolver = resolver_cache.get(key)
+    if resolver is None or resolver.venues is not venues:
+        resolver = ShowtimeResolver(venues)
+        resolver_cache.set(key, resolver)
+    return resolver
 
-def slugify(text):
-    return re.sub(r'[^a-z0-9-]', '', re.sub(r'\s+', '-', text.strip().lower()))
+
+async def resolve_movie_id(city_slug: str, movie_slug: str) -> str | None:
+    """
+    Find the BookMyShow movie ID best matching `movie_slug` in the city listing.
+    The listing and its index are reused while fresh, so this never re-scrapes.
+    """
+    movies = await fetch_city_movies(city_slug)
+    index = movie_index_cache.get(city_slug)
+    if index is None or index.movies is not movies:
+        index = MovieIndex(movies)
+        movie_index_cache.set(city_slug, index)
+    return index.lookup(movie_slug)
 
 FETCH_VENUE_SHOWTIME_DESCRIPTION = RichToolDescription(
     description=(
@@ -211,19 +437,27 @@ FETCH_VENUE_SHOWTIME_DESCRIPTION = RichToolDescription(
         "and wants to get venue and showtime , price information for booking."
     ),
     side_effects=(
-        "Returns a JSON-formatted string containing venue details, including venue name, venue code, and showtimes with session IDs and seat categories/prices."
+        "Returns a JSON-formatted string containing venue details, including venue name, venue code, and showtimes with seat categories/prices. "
+        "Each show has an opaque 'handle'; pass it as booking_handle, together with the response's 'bookingContext' as booking_context, "
+        "to book_movie_tickets to get the booking link directly. "
+        "In the default compact format each show's 'categories' are indexes into the top-level 'categories' list of [seatType, price] pairs. "
         "Returns internal identifiers such as movie_id, session_id, and venue_id which must NOT be shown to the user, "
-        "but should be retained for internal processing and should be used as a input for the tool book_movie_tickets if needed."
+        "but should be retained for internal processing and should be used as a input for the tool book_movie_tickets if needed. "
+        "If BookMyShow is unreachable, the last good data is returned with 'staleSeconds' giving its age; mention that it may be out of date."
     )
 )
 
 from typing import Optional
 @mcp.tool(description=FETCH_VENUE_SHOWTIME_DESCRIPTION.model_dump_json())
+@metrics.timed("bms_tool_seconds", tool="get_movie_venue_details")
 async def get_movie_venue_details(
     movie_name: str,
     target_date: str,
     movie_id: Optional[str] = "",
-    city: str = ""
+    city: str = "",
+    compact: bool = True,
+    max_venues: int = 0,
+    max_shows_per_venue: int = 0
 ) -> str:
     """
     Args:
@@ -231,12 +465,25 @@ async def get_movie_venue_details(
         target_date (str): Date in YYYYMMDD format.
         movie_id (str): Optional BookMyShow movie ID; if omitted, auto-detection is attempted.
         city (str): Full, correctly spelled city name.
+        compact (bool): Return minified JSON with a shared seat category table (default).
+            Set to False for the expanded, indented format.
+        max_venues (int): In compact mode, return at most this many venues (0 = no limit).
+        max_shows_per_venue (int): In compact mode, return at most this many shows per venue (0 = no limit).
 
     Returns:
         str: JSON-formatted string of venue details, including:
             - venueName: Name of the theatre/venue
             - venueCode: Internal venue code
-            - shows: List of showtimes with session IDs and seat categories/prices
+            - shows: List of showtimes with seat categories/prices and a signed
+              booking `handle` for book_movie_tickets (which carries the session
+              ID; `sessionId` is listed instead when no handle can be made)
+            - bookingContext: Signed token for the city, movie and date, passed
+              to book_movie_tickets along with a show's `handle`
+            In compact mode, show categories are indexes into a top-level
+            `categories` list of [seatType, price] pairs, and a `truncated`
+            entry counts any venues/shows dropped by the limits.
+            `staleSeconds` is present only when BookMyShow could not be
+            reached and the last good snapshot (that many seconds old) is served.
 
     Raises:
         ValueError: If the movie cannot be found in the specified city.
@@ -248,106 +495,113 @@ async def get_movie_venue_details(
 
     # Step 1: Find movie_id if not provided
     if not movie_id:
-        search_url = f"https://in.bookmyshow.com/explore/movies-{city_slug}"
-        encoded_url = urllib.parse.quote(search_url)
-        api_url = f"http://api.scrape.do/?token={token}&url={encoded_url}"
-        resp = requests.get(api_url)
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        movie_id = None
-        for a in soup.find_all("a", href=True):
-            if f"/movies/{city_slug}/" in a["href"] and movie_slug in a["href"]:
-                parts = a["href"].rstrip("/").split("/")
-                if len(parts) >= 5:
-                    movie_id = parts[-1]
-                    break
+        movie_id = await resolve_movie_id(city_slug, movie_slug)
         if not movie_id:
             raise ValueError(f"Movie '{movie_name}' not found in {city}.")
 
-    # Step 2: Construct buytickets URL
-    # movie_slug = movie_name.strip().lower().replace(" ", "-")
-    target_url = f"https://in.bookmyshow.com/movies/{city_slug}/{movie_slug}/buytickets/{movie_id}/{target_date}"
-    encoded_target_url = urllib.parse.quote(target_url)
-    scrape_url = f"http://api.scrape.do/?token={token}&url={encoded_target_url}"
-
-    # Step 3: Extract JSON from _INITIAL_STATE_
-    html = requests.get(scrape_url).text
-    marker = "__INITIAL_STATE__"
-    start = html.find(marker)
-    if start == -1:
-        raise RuntimeError("Could not find _INITIAL_STATE_ in HTML")
-
-    start += len(marker)
-    while start < len(html) and html[start] not in '{':
-        start += 1
-    brace_count = 0
-    in_string = False
-    escaped = False
-    json_start = None
-    for i, ch in enumerate(html[start:], start=start):
-        if ch == '"' and not escaped:
-            in_string = not in_string
-        elif ch == "\\" and in_string:
-            escaped = not escaped
-            continue
+    # Step 2: Fetch the venue and showtime details for the date
+    results, stale_age = await showtimes_snapshot(city_slug, movie_slug, movie_id, target_date)
+
+    with metrics.span("bms_stage_seconds", stage="serialize", source="venue_details"):
+        context, handle = show_handles(city_slug, movie_id, target_date)
+        if compact:
+            final_output = {"movieId": movie_id, **venues_to_compact(results, max_venues, max_shows_per_venue, handle)}
         else:
-            escaped = False
-
-        if not in_string:
-            if ch == '{':
-                if brace_count == 0:
-                    json_start = i
-                brace_count += 1
-            elif ch == '}':
-                brace_count -= 1
-                if brace_count == 0 and json_start is not None:
-                    json_str = html[json_start:i+1]
-                    data = json.loads(json_str)
-                    break
-
-    # Step 4: Extract venue and showtime details
-    results = []
-    show_dates = data.get("showtimesByEvent", {}).get("showDates", {})
-    date_obj = show_dates.get(target_date, {})
-    widgets = date_obj.get("dynamic", {}).get("data", {}).get("showtimeWidgets", [])
-
-    for widget in widgets:
-        if widget.get("type") == "groupList" and widget.get("id") == "List_1":
-            for group in widget.get("data", []):
-                if group.get("type") == "venueGroup" and group.get("id") == "Venue_GROUP_1":
-                    for venue in group.get("data", []):
-                        if venue.get("type") == "venue-card":
-                            vdata = venue.get("additionalData", {})
-                            venue_name = vdata.get("venueName")
-                            venue_code = vdata.get("venueCode")
-                            theatre_info = {
-                                "venueName": venue_name,
-                                "venueCode": venue_code,
-                                "shows": []
-                            }
-                            for show in venue.get("showtimes", []):
-                                show_time = show.get("title") or show.get("showTime")
-                                session_id = show.get("additionalData", {}).get("sessionId")
-                                categories = [
-                                    {
-                                        "seatType": cat.get("priceDesc"),
-                                        "price": cat.get("curPrice")
-                                    }
-                                    for cat in show.get("additionalData", {}).get("categories", [])
-                                ]
-                                theatre_info["shows"].append({
-                                    "time": show_time,
-                                    "sessionId": session_id,
-                                    "categories": categories
-                                })
-                            results.append(theatre_info)
-
-    final_output = {
-        "movieId": movie_id,
-        "venues": results
-    }
+            final_output = {
+                "movieId": movie_id,
+                "venues": venues_to_dicts(results, handle)
+            }
+        if context is not None:
+            final_output["bookingContext"] = context
+        if stale_age is not None:
+            final_output["staleSeconds"] = int(stale_age)
+
+        if compact:
+            return dumps_compact(final_output)
+        return json.dumps(final_output, indent=2, ensure_ascii=False)
+
 
-    return json.dumps(final_output, indent=2, ensure_ascii=False)
+class ShowtimeQuery(BaseModel):
+    movie_name: str = Field(description="Full, correctly spelled movie name")
+    date: str = Field(description="Date in YYYYMMDD format")
+    movie_id: str = Field(default="", description="BookMyShow movie ID if known, otherwise empty")
+
+
+BATCH_MAX_ITEMS = int(os.environ.get("BMS_BATCH_MAX_ITEMS", 20))
+BATCH_CONCURRENCY = int(os.environ.get("BMS_BATCH_CONCURRENCY", 4))
+
+FETCH_VENUE_SHOWTIME_BATCH_DESCRIPTION = RichToolDescription(
+    description=(
+        "Fetch venues, showtimes and seat prices for several movies and/or dates in one city in a single call. "
+        "Returns compact JSON: a top-level 'categories' list of [seatType, price] pairs shared by all results, and a "
+        "'results' list with one entry per requested (movie, date) containing 'venues' (show categories are indexes "
+        "into 'categories'; each show has an opaque 'handle' for book_movie_tickets, used with that item's 'bookingContext') "
+        "or an 'error' for that item only."
+    ),
+    use_when=(
+        "Use this tool instead of repeated get_movie_venue_details calls when the user wants showtimes for more than one "
+        "movie, or for the same movie over several days, in one city."
+    ),
+    side_effects=(
+        "Returns internal identifiers such as movie_id, session_id and venue codes which must NOT be shown to the user, "
+        "but should be retained and used as input for book_movie_tickets if needed. "
+        "If BookMyShow is unreachable, results may carry 'staleSeconds' giving its age; mention that it may be out of date."
+    )
+)
+
+@mcp.tool(description=FETCH_VENUE_SHOWTIME_BATCH_DESCRIPTION.model_dump_json())
+@metrics.timed("bms_tool_seconds", tool="get_movie_venue_details_batch")
+async def get_movie_venue_details_batch(
+    city: Annotated[str, Field(description="Full, correctly spelled city name")],
+    queries: Annotated[list[ShowtimeQuery], Field(description="The (movie, date) pairs to look up")],
+    max_venues: Annotated[int, Field(description="At most this many venues per result (0 = no limit)")] = 0,
+    max_shows_per_venue: Annotated[int, Field(description="At most this many shows per venue (0 = no limit)")] = 0,
+) -> str:
+    """
+    Fetch venue details for many (movie, date) pairs in one city concurrently.
+
+    At most BMS_BATCH_CONCURRENCY buytickets pages are fetched at a time; a
+    failure for one item is reported in that item's `error` field and does not
+    fail the rest of the batch.
+    """
+    if len(queries) > BATCH_MAX_ITEMS:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=f"At most {BATCH_MAX_ITEMS} queries are allowed per batch"))
+
+    city_slug = slugify(city)
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def lookup(query: ShowtimeQuery) -> tuple[str, list[Venue], float | None]:
+        async with slots:
+            with upstream_priority(BATCH):
+                movie_slug = slugify(query.movie_name)
+                movie_id = query.movie_id or await resolve_movie_id(city_slug, movie_slug)
+                if not movie_id:
+                    raise ValueError(f"Movie '{query.movie_name}' not found in {city}.")
+                return movie_id, *await showtimes_snapshot(city_slug, movie_slug, movie_id, query.date)
+
+    outcomes = await asyncio.gather(*(lookup(q) for q in queries), return_exceptions=True)
+
+    with metrics.span("bms_stage_seconds", stage="serialize", source="venue_details_batch"):
+        encoder = CompactEncoder()
+        results = []
+        for query, outcome in zip(queries, outcomes):
+            item = {"movieName": query.movie_name, "date": query.date}
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, Exception):
+                    raise outcome
+                item["error"] = str(outcome) or repr(outcome)
+            else:
+                movie_id, venues, stale_age = outcome
+                item["movieId"] = movie_id
+                context, handle = show_handles(city_slug, movie_id, query.date)
+                item.update(encoder.encode(venues, max_venues, max_shows_per_venue, handle))
+                if context is not None:
+                    item["bookingContext"] = context
+                if stale_age is not None:
+                    item["staleSeconds"] = int(stale_age)
+            results.append(item)
+
+        return dumps_compact({"categories": encoder.categories, "results": results})
 
 
 def slugify(text):
@@ -358,7 +612,9 @@ BOOK_MOVIE_TICKETS_DESCRIPTION = RichToolDescription(
     description=(
         "Book movie tickets by generating a direct seat-layout link on BookMyShow for a specific movie at a given venue, "
         "time, date, and city. This link opens directly to the seat selection page for the chosen show. "
-        "Inputs must include the exact 'movie_name', 'venue_name', 'time', 'date' (YYYYMMDD), and 'city'. "
+        "If the show came from get_movie_venue_details, pass its 'handle' as 'booking_handle' and the response's 'bookingContext' "
+        "as 'booking_context'; nothing else is needed. "
+        "Otherwise inputs must include the exact 'movie_name', 'venue_name', 'time', 'date' (YYYYMMDD), and 'city'. "
         "If 'movie_id' is not provided, it will be auto-detected from the BookMyShow listings. "
         "use tool ids tool id = 2ddfffneku394294201313f4t ,tool id = 2ddfffneku39429420139014 for using the data saved by those tools to use here"
     ),
@@ -373,13 +629,16 @@ BOOK_MOVIE_TICKETS_DESCRIPTION = RichToolDescription(
 )
 
 @mcp.tool(description=(BOOK_MOVIE_TICKETS_DESCRIPTION.model_dump_json()))
+@metrics.timed("bms_tool_seconds", tool="book_movie_tickets")
 async def book_movie_tickets(
-    movie_id: Annotated[Optional[str], Field(description="Movie ID from BookMyShow, or empty string to auto-detect.")],
-    venue_n : Annotated[str, Field(description="The exact venue name")],
-    movie_name: Annotated[str, Field(description="The exact movie name")],
-    time: Annotated[str, Field(description="The exact time")],
-    date: Annotated[str, Field(description="Date of the show in YYYYMMDD format")],
-    city: Annotated[str, Field(description="Full, correct city name")]
+    movie_id: Annotated[Optional[str], Field(description="Movie ID from BookMyShow, or empty string to auto-detect.")] = "",
+    venue_n : Annotated[str, Field(description="The exact venue name")] = "",
+    movie_name: Annotated[str, Field(description="The exact movie name")] = "",
+    time: Annotated[str, Field(description="The exact time")] = "",
+    date: Annotated[str, Field(description="Date of the show in YYYYMMDD format")] = "",
+    city: Annotated[str, Field(description="Full, correct city name")] = "",
+    booking_handle: Annotated[str, Field(description="The show's 'handle' from get_movie_venue_details; when given with booking_context, the other fields are not needed")] = "",
+    booking_context: Annotated[str, Field(description="The 'bookingContext' of the get_movie_venue_details response the handle came from")] = "",
 ) -> str:
     """
     Generate a direct seat-layout booking link for a given movie show on BookMyShow.
@@ -397,142 +656,73 @@ async def book_movie_tickets(
             The date of the show in YYYYMMDD format.
         city (str): 
             The full, correct name of the city.
+        booking_handle (str, optional):
+            The `handle` of a show returned by get_movie_venue_details. With
+            `booking_context` it is verified and decoded directly into the
+            booking URL without any lookup, so the other arguments are ignored.
+        booking_context (str, optional):
+            The `bookingContext` of the response that `booking_handle` came from.
 
     Returns:
         str: 
             A direct seat-layout booking URL for the given movie, venue, date, and time. 
             This URL can be opened in a browser to proceed directly to seat selection.
-            Returns `None` if the venue or time does not match available listings.
+            If the venue or time does not match available listings, returns an
+            `<error>` string listing the closest venues and their show times.
     """
-    
+    if booking_handle:
+        try:
+            return handle_signer.decode(booking_context, booking_handle).seat_layout_url()
+        except ValueError:
+            return "<error>Invalid booking handle; call get_movie_venue_details again or pass the venue, time, date and city.</error>"
+
+    if not (venue_n and time and date and city):
+        return "<error>Pass either booking_handle and booking_context, or venue_n, time, date and city.</error>"
+
     city_slug = slugify(city)
     movie_slug = slugify(movie_name)
 
     # Step 1: Find movie_id if not provided
     if not movie_id:
-        search_url = f"https://in.bookmyshow.com/explore/movies-{city_slug}"
-        encoded_url = urllib.parse.quote(search_url)
-        api_url = f"http://api.scrape.do/?token={token}&url={encoded_url}"
-        resp = requests.get(api_url)
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        movie_id = None
-        for a in soup.find_all("a", href=True):
-            if f"/movies/{city_slug}/" in a["href"] and movie_slug in a["href"]:
-                parts = a["href"].rstrip("/").split("/")
-                if len(parts) >= 5:
-                    movie_id = parts[-1]
-                    break
+        movie_id = await resolve_movie_id(city_slug, movie_slug)
 
         if not movie_id:
             raise ValueError(f"Movie '{movie_name}' not found in {city}.")
 
-    # Step 2: Fetch INITIAL_STATE JSON
-    target_url = f"https://in.bookmyshow.com/movies/{city_slug}/{movie_slug}/buytickets/{movie_id}/{date}"
-    encoded_url = urllib.parse.quote(target_url)
-    url = f"http://api.scrape.do/?token={token}&url={encoded_url}"
-
-    html = requests.get(url).text
-    marker = "__INITIAL_STATE__"
-    start = html.find(marker)
-    if start == -1:
-        raise RuntimeError("Could not find INITIAL_STATE in HTML")
-
-    start += len(marker)
-
-    brace_count = 0
-    in_string = False
-    escaped = False
-    json_start = None
-    json_data = None
-    for i, ch in enumerate(html[start:], start=start):
-        if ch == '"' and not escaped:
-            in_string = not in_string
-        elif ch == "\\" and in_string:
-            escaped = not escaped
-            continue
-        else:
-            escaped = False
-
-        if not in_string:
-            if ch == '{':
-                if brace_count == 0:
-                    json_start = i
-                brace_count += 1
-            elif ch == '}':
-                brace_count -= 1
-                if brace_count == 0 and json_start is not None:
-                    json_str = html[json_start:i+1]
-                    json_data = json.loads(json_str)
-                    with open("bms_state.json", "w", encoding="utf-8") as f:
-                        json.dump(json_data, f, indent=2, ensure_ascii=False)
-                    print("✅ Extracted and saved JSON to bms_state.json")
-                    break
-
-    if not json_data:
-        raise RuntimeError("Could not parse INITIAL_STATE JSON")
-
-    # Step 3: Extract mapping list
-    mapping_list = []
-    show_dates = json_data.get("showtimesByEvent", {}).get("showDates", {})
-    date_obj = show_dates.get(date, {})
-    widgets = date_obj.get("dynamic", {}).get("data", {}).get("showtimeWidgets", [])
-
-    for widget in widgets:
-        if widget.get("type") == "groupList" and widget.get("id") == "List_1":
-            for group in widget.get("data", []):
-                if group.get("type") == "venueGroup" and group.get("id") == "Venue_GROUP_1":
-                    for venue in group.get("data", []):
-                        if venue.get("type") == "venue-card":
-                            vdata = venue.get("additionalData", {})
-                            venue_name = vdata.get("venueName")
-                            venue_code = vdata.get("venueCode")
-
-                            for show in venue.get("showtimes", []):
-                                show_time = show.get("title") or show.get("showTime")
-                                session_id = show.get("additionalData", {}).get("sessionId")
-                                mapping_list.append({
-                                    "venueName": venue_name,
-                                    "venueCode": venue_code,
-                                    "timer": show_time,
-                                    "sessionId": session_id
-                                })
-
-    venue_name_lower = venue_n.strip().lower()
-
-    venue_names_in_mapping = [entry["venueName"].strip().lower() for entry in mapping_list]
-    closest_matches = difflib.get_close_matches(venue_name_lower, venue_names_in_mapping, n=1, cutoff=0.6)
-
-    if not closest_matches:
-        return None  # No similar venue found
-
-    best_match = closest_matches[0]
-
-    def normalize_time(t):
-        # Lowercase and strip spaces
-        t = t.strip().lower()
-        # Remove am/pm
-        t = re.sub(r'\s*(am|pm)$', '', t)
-        # Remove leading zero from hour if present (e.g. 06:00 -> 6:00)
-        t = re.sub(r'^0', '', t)
-        return t
-
-    input_time_norm = normalize_time(time)
-
-    for entry in mapping_list:
-        entry_venue = entry["venueName"].strip().lower()
-        entry_time_norm = normalize_time(entry["timer"])
-
-        if entry_venue == best_match and entry_time_norm == input_time_norm:
-            return f"https://in.bookmyshow.com/movies/{city_slug}/seat-layout/{movie_id}/{entry['venueCode']}/{entry['sessionId']}/{date}"
-
-    return None
+    # Step 2: Fetch the showtime snapshot (cached after get_movie_venue_details)
+    venues = await fetch_showtimes(city_slug, movie_slug, movie_id, date)
+
+    # Step 3: Resolve venue and time to venueCode and sessionId
+    resolver = showtime_resolver((city_slug, movie_id, date), venues)
+    match = resolver.resolve(venue_n, time)
+    if match is None:
+        candidates = json.dumps(resolver.candidates(venue_n), ensure_ascii=False)
+        return f"<error>No show found at '{venue_n}' at {time}. Closest matches: {candidates}</error>"
+
+    venue_code, session_id = match
+    return BookingHandle(city_slug, movie_id, venue_code, session_id, date).seat_layout_url()
 
 # --- Run MCP Server ---
 async def main():
     print("🚀 Starting MCP server on http://0.0.0.0:8086")
     port = int(os.environ.get("PORT", 8080))
-    await mcp.run_async("streamable-http", host="0.0.0.0", port=port)
+    prewarmer = Prewarmer.from_env(
+        lambda city: fetch_city_movies(slugify(city), refresh=True),
+        lambda city, movie_slug, movie_id, date: fetch_showtimes(slugify(city), movie_slug, movie_id, date, refresh=True),
+    )
+    if prewarmer is not None:
+        # The prewarm task inherits this context, so its scrapes queue behind user calls.
+        with upstream_priority(BACKGROUND):
+            prewarmer.start()
+    try:
+        await mcp.run_async("streamable-http", host="0.0.0.0", port=port)
+    finally:
+        if prewarmer is not None:
+            await prewarmer.stop()
+        await debug_snapshots.drain()
+        await scraper.aclose()
+        await http_pool.aclose()
+        html_simplifier.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
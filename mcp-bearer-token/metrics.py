@@ -0,0 +1,124 @@
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_INF_LABEL = 'le="+Inf"'
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Span:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text format.
+
+    Histograms and counters are plain Python objects updated inline (a bisect
+    and three additions per observation), so spans are cheap enough for the
+    hot path. Gauges are pulled from registered collectors only when rendering.
+    """
+
+    def __init__(self):
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._collectors: list[Callable[[], Iterable[tuple[str, dict, float]]]] = []
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        series = self._histograms.setdefault(name, {})
+        key = _label_key(labels)
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = Histogram()
+        return hist
+
+    def span(self, name: str, **labels) -> _Span:
+        """Time a `with` block into the `name` histogram (seconds)."""
+        return _Span(self.histogram(name, **labels))
+
+    def timed(self, name: str, **labels):
+        """Decorator form of `span` for async functions."""
+        def decorator(fn):
+            @wraps(fn)
+            async def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return await fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        series = self._counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def register_collector(self, collector: Callable[[], Iterable[tuple[str, dict, float]]]) -> None:
+        """Register a callable yielding `(gauge name, labels, value)` at render time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for name, series in self._histograms.items():
+            lines.append(f"# TYPE {name} histogram")
+            for key, hist in series.items():
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{name}_bucket{_format_labels(key, le)} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, _INF_LABEL)} {hist.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {hist.sum}")
+                lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        for name, series in self._counters.items():
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+        gauges: dict[str, list[str]] = {}
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                gauges.setdefault(name, []).append(f"{name}{_format_labels(_label_key(labels))} {value}")
+        for name, samples in gauges.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+class Prewarmer:
+    """
+    Background task that keeps popular BookMyShow data warm in the caches.
+
+    Every `interval` seconds (with +/- `jitter` randomisation so several workers
+    do not refresh in lockstep) it re-scrapes the listing for each configured
+    city, then the buytickets snapshots for the first `top_n` movies listed,
+    for today and the following `days - 1` days. At most `concurrency` scrapes
+    run at a time so user-facing calls keep most of the upstream budget.
+    """
+
+    def __init__(
+        self,
+        cities: list[str],
+        refresh_listing: Callable[[str], Awaitable[list[dict]]],
+        refresh_showtimes: Callable[[str, str, str, str], Awaitable[object]],
+        top_n: int = 5,
+        days: int = 2,
+        interval: float = 900.0,
+        jitter: float = 0.2,
+        concurrency: int = 2,
+    ):
+        self.cities = cities
+        self.refresh_listing = refresh_listing
+        self.refresh_showtimes = refresh_showtimes
+        self.top_n = top_n
+        self.days = days
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.runs = 0
+        self.failures = 0
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def from_env(cls, refresh_listing, refresh_showtimes) -> "Prewarmer | None":
+        """Build a prewarmer from BMS_PREWARM_* settings; None when no cities are configured."""
+        env = os.environ
+        cities = [c.strip() for c in env.get("BMS_PREWARM_CITIES", "").split(",") if c.strip()]
+        if not cities:
+            return None
+        return cls(
+            cities,
+            refresh_listing,
+            refresh_showtimes,
+            top_n=int(env.get("BMS_PREWARM_TOP_N", 5)),
+            days=int(env.get("BMS_PREWARM_DAYS", 2)),
+            interval=float(env.get("BMS_PREWARM_INTERVAL", 900)),
+            concurrency=int(env.get("BMS_PREWARM_CONCURRENCY", 2)),
+        )
+
+    def dates(self) -> list[str]:
+        today = datetime.now(IST).date()
+        return [(today + timedelta(days=i)).strftime("%Y%m%d") for i in range(self.days)]
+
+    async def run_once(self) -> None:
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def guarded(coro_fn, *args):
+            async with slots:
+                try:
+                    return await coro_fn(*args)
+                except Exception as e:
+                    self.failures += 1
+                    print(f"⚠️ Prewarm of {args} failed: {e!r}")
+                    return None
+
+        listings = await asyncio.gather(*(guarded(self.refresh_listing, city) for city in self.cities))
+        jobs = [
+            guarded(self.refresh_showtimes, city, movie["slug"], movie["id"], date)
+            for city, movies in zip(self.cities, listings)
+            for movie in (movies or [])[:self.top_n]
+            for date in self.dates()
+        ]
+        await asyncio.gather(*jobs)
+        self.runs += 1
+
+    async def run_forever(self) -> None:
+        # Start with a short random delay so freshly started workers spread out.
+        await asyncio.sleep(random.uniform(0, self.interval * self.jitter))
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self.run_forever())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
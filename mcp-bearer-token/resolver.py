@@ -0,0 +1,161 @@
+import difflib
+import re
+from collections import Counter
+
+from showtimes import Venue
+
+
+def normalize_time(t: str) -> str:
+    # Lowercase and strip spaces
+    t = t.strip().lower()
+    # Remove am/pm
+    t = re.sub(r'\s*(am|pm)$', '', t)
+    # Remove leading zero from hour if present (e.g. 06:00 -> 6:00)
+    t = re.sub(r'^0', '', t)
+    return t
+
+
+def normalize_venue(name: str | None) -> str:
+    return (name or "").strip().lower()
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ShowtimeResolver:
+    """
+    Lookup tables built once per showtime snapshot for booking.
+
+    Venue names are deduplicated and indexed by word token and character
+    trigram, so a fuzzy venue lookup only scores venues that share text with
+    the query, and `(venue, normalized time)` maps straight to the show's
+    `(venueCode, sessionId)`.
+    """
+
+    def __init__(self, venues: list[Venue]):
+        self.venues = venues
+        self.venue_names: list[str] = []
+        self._display: dict[str, str] = {}
+        self._token_index: dict[str, set[int]] = {}
+        self._trigram_index: dict[str, set[int]] = {}
+        self._shows: dict[tuple[str, str], tuple[str, str]] = {}
+        self._times: dict[str, list[str]] = {}
+
+        positions: dict[str, int] = {}
+        for venue in venues:
+            name = normalize_venue(venue.name)
+            if name not in positions:
+                positions[name] = len(self.venue_names)
+                self.venue_names.append(name)
+                self._display[name] = venue.name
+                self._times[name] = []
+                for token in name.split():
+                    self._token_index.setdefault(token, set()).add(positions[name])
+                for gram in _trigrams(name):
+                    self._trigram_index.setdefault(gram, set()).add(positions[name])
+            for show in venue.shows:
+                if show.time is None:
+                    continue
+                self._times[name].append(show.time)
+                self._shows.setdefault((name, normalize_time(show.time)), (venue.code, show.session_id))
+
+    def match_venues(self, venue: str, k: int = 5, cutoff: float = 0.6) -> list[tuple[str, float]]:
+        """Return up to `k` indexed venue names scoring at least `cutoff` against `venue`, best first."""
+        query = normalize_venue(venue)
+        if query in self._times:
+            return [(query, 1.0)]
+
+        overlap = Counter()
+        for token in query.split():
+            overlap.update(self._token_index.get(token, ()))
+        for gram in _trigrams(query):
+            overlap.update(self._trigram_index.get(gram, ()))
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(query)
+        scored = []
+        for idx, _ in overlap.most_common(max(k * 4, 20)):
+            name = self.venue_names[idx]
+            matcher.set_seq1(name)
+            ratio = matcher.ratio()
+            if ratio >= cutoff:
+                scored.append((name, ratio))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+    def resolve(self, venue: str, time: str) -> tuple[str, str] | None:
+        """Return `(venueCode, sessionId)` for the best-matching venue at `time`, or None."""
+        matches = self.match_venues(venue, k=1)
+        if not matches:
+            return None
+        return self._shows.get((matches[0][0], normalize_time(time)))
+
+    def candidates(self, venue: str, k: int = 3) -> list[dict]:
+        """Closest venues to `venue` with their show times, for reporting a failed lookup."""
+        return [
+            {"venueName": self._display[name], "times": self._times[name]}
+            for name, _ in self.match_venues(venue, k=k, cutoff=0.0)
+        ]
+
+
+def normalize_title(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+class MovieIndex:
+    """
+    Lookup tables built once per city listing for resolving a movie name to its ID.
+
+    An exact slug or normalized title is a dictionary hit. Otherwise the
+    candidates sharing character trigrams with the query are ranked by
+    similarity, with titles that contain the query (e.g. "kgf" in
+    "kgf-chapter-2") ranked first, so sequels and overlapping titles resolve
+    to the closest listing instead of the first substring match on the page.
+    """
+
+    def __init__(self, movies: list[dict]):
+        self.movies = movies
+        self._by_slug: dict[str, dict] = {}
+        self._by_title: dict[str, dict] = {}
+        self._titles: list[str] = []
+        self._trigram_index: dict[str, set[int]] = {}
+
+        for movie in movies:
+            self._by_slug.setdefault(movie["slug"], movie)
+            title = normalize_title(movie["slug"])
+            self._by_title.setdefault(title, movie)
+            self._by_title.setdefault(normalize_title(movie["name"]), movie)
+            position = len(self._titles)
+            self._titles.append(title)
+            for gram in _trigrams(title):
+                self._trigram_index.setdefault(gram, set()).add(position)
+
+    def search(self, query: str, k: int = 5, cutoff: float = 0.6) -> list[tuple[dict, float]]:
+        """Return up to `k` `(movie, score)` pairs for `query`, best first."""
+        exact = self._by_slug.get(query) or self._by_title.get(normalize_title(query))
+        if exact is not None:
+            return [(exact, 1.0)]
+
+        title_query = normalize_title(query)
+        overlap = Counter()
+        for gram in _trigrams(title_query):
+            overlap.update(self._trigram_index.get(gram, ()))
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(title_query)
+        ranked = []
+        for position, _ in overlap.most_common(max(k * 4, 20)):
+            title = self._titles[position]
+            matcher.set_seq1(title)
+            ratio = matcher.ratio()
+            contains = f" {title_query} " in f" {title} "
+            if contains or ratio >= cutoff:
+                ranked.append((self.movies[position], ratio + (1.0 if contains else 0.0)))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:k]
+
+    def lookup(self, query: str) -> str | None:
+        matches = self.search(query, k=1)
+        return matches[0][0]["id"] if matches else None
@@ -0,0 +1,214 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+from metrics import metrics
+
+INTERACTIVE = 0
+BATCH = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+
+# Priority of upstream requests made from the current task; tasks inherit it
+# from the context they were created in.
+current_priority: ContextVar[int] = ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+class SharedPriority:
+    """
+    Priority of work shared by several callers, such as a single-flight scrape.
+
+    It starts at the priority of the caller that started the work and is
+    raised by `join` to the most urgent caller waiting on it; upstream requests
+    still queued under it are moved up accordingly.
+    """
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self._queued: list[tuple["UpstreamScheduler", list]] = []
+
+    def join(self, priority: int) -> None:
+        if priority < self.priority:
+            self.priority = priority
+            for scheduler, entry in self._queued:
+                scheduler._promote(entry, priority)
+
+
+shared_priority: ContextVar[SharedPriority | None] = ContextVar("shared_upstream_priority", default=None)
+
+
+def effective_priority() -> int:
+    """Priority upstream requests from the current task are queued at."""
+    shared = shared_priority.get()
+    return shared.priority if shared is not None else current_priority.get()
+
+
+@contextmanager
+def upstream_priority(priority: int):
+    """Run the enclosed code (and tasks it creates) at `priority`."""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class UpstreamScheduler:
+    """
+    Admission control for outbound scrape.do requests.
+
+    Waiting requests are granted in priority order (interactive, then batch,
+    then background; FIFO within a level), with at most `max_in_flight`
+    running at once and at most `per_host_limit` per target host; a request
+    whose host is busy is skipped over, so priority decides the order in
+    which every request gets to run rather than only its place in line. When `credits_per_minute` is set, a token bucket holding
+    up to `burst` credits also has to cover each request; batch and background
+    requests additionally leave `reserve` of the bucket untouched, so a user
+    waiting on a tool call is not queued behind refreshes when close to quota.
+    A request never needs more than `burst` credits, so a small bucket slows
+    low-priority requests down instead of starving them.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        per_host_limit: int = 8,
+        credits_per_minute: float = 0.0,
+        burst: float | None = None,
+        reserve: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_in_flight = max_in_flight
+        self.per_host_limit = per_host_limit
+        self.rate = credits_per_minute / 60
+        self.burst = burst if burst is not None else max(1.0, credits_per_minute / 6)
+        self.reserve = reserve
+        self.clock = clock
+        self.tokens = self.burst
+        self.in_flight = 0
+        self.host_in_flight: dict[str, int] = {}
+        self.granted = 0
+        self._updated = clock()
+        self._queue: list[list] = []  # [priority, seq, waiter, host] heap entries
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    @classmethod
+    def from_env(cls) -> "UpstreamScheduler":
+        """Build a scheduler from the SCRAPE_MAX_IN_FLIGHT / SCRAPE_PER_HOST_LIMIT / SCRAPE_CREDITS_* environment variables."""
+        env = os.environ
+        burst = env.get("SCRAPE_CREDITS_BURST")
+        return cls(
+            max_in_flight=int(env.get("SCRAPE_MAX_IN_FLIGHT", 16)),
+            per_host_limit=int(env.get("SCRAPE_PER_HOST_LIMIT", 8)),
+            credits_per_minute=float(env.get("SCRAPE_CREDITS_PER_MINUTE", 0)),
+            burst=float(burst) if burst else None,
+            reserve=float(env.get("SCRAPE_CREDITS_RESERVE", 0.2)),
+        )
+
+    def _refill(self) -> None:
+        now = self.clock()
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _needed(self, priority: int) -> float:
+        needed = 1.0 if priority == INTERACTIVE else 1.0 + self.reserve * self.burst
+        return min(needed, self.burst)
+
+    @asynccontextmanager
+    async def slot(self, priority: int | None = None, host: str | None = None):
+        """Wait for permission to send one upstream request (to `host`) and hold it for the block."""
+        shared = shared_priority.get() if priority is None else None
+        priority = effective_priority() if priority is None else priority
+        enqueued_at = self.clock()
+        waiter = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), waiter, host]
+        heapq.heappush(self._queue, entry)
+        if shared is not None:
+            shared._queued.append((self, entry))
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(host)
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if shared is not None:
+                shared._queued.remove((self, entry))
+        priority = entry[0]
+        metrics.histogram("bms_upstream_queue_seconds", priority=PRIORITY_NAMES.get(priority, str(priority))).observe(
+            self.clock() - enqueued_at
+        )
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    def _release(self, host: str | None) -> None:
+        self.in_flight -= 1
+        if host is not None:
+            self.host_in_flight[host] -= 1
+            if not self.host_in_flight[host]:
+                del self.host_in_flight[host]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        self._refill()
+        host_busy = []
+        while self._queue and self.in_flight < self.max_in_flight:
+            entry = heapq.heappop(self._queue)
+            priority, _, waiter, host = entry
+            if waiter.done():
+                continue  # cancelled while queued
+            if host is not None and self.host_in_flight.get(host, 0) >= self.per_host_limit:
+                host_busy.append(entry)
+                continue
+            if self.rate and self.tokens < self._needed(priority):
+                heapq.heappush(self._queue, entry)
+                self._wake_in((self._needed(priority) - self.tokens) / self.rate)
+                break
+            self.in_flight += 1
+            if host is not None:
+                self.host_in_flight[host] = self.host_in_flight.get(host, 0) + 1
+            self.granted += 1
+            if self.rate:
+                self.tokens -= 1
+            waiter.set_result(None)
+        for entry in host_busy:
+            heapq.heappush(self._queue, entry)
+
+    def _promote(self, entry: list, priority: int) -> None:
+        if not entry[2].done() and priority < entry[0]:
+            entry[0] = priority
+            heapq.heapify(self._queue)
+            self._dispatch()
+
+    def _wake_in(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        if self._timer is not None:
+            if self._timer.when() <= loop.time() + delay:
+                return
+            self._timer.cancel()  # a promoted or more urgent request can go sooner
+        self._timer = loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "queued": sum(1 for _, _, waiter, _ in self._queue if not waiter.done()),
+            "in_flight": self.in_flight,
+            "granted": self.granted,
+            "tokens": self.tokens if self.rate else None,
+        }
@@ -0,0 +1,126 @@
+import os
+import urllib.parse
+
+import httpx
+from mcp import ErrorData, McpError
+from mcp.types import INTERNAL_ERROR
+
+from metrics import metrics
+from scheduler import UpstreamScheduler
+from upstream_policy import UpstreamPolicy
+
+SCRAPE_DO_ENDPOINT = "http://api.scrape.do/"
+
+
+class UpstreamError(McpError):
+    """
+    A scrape.do request that failed. `status` is the HTTP status, or None when
+    no response arrived (transport error or timeout).
+    """
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(ErrorData(code=INTERNAL_ERROR, message=message))
+        self.status = status
+
+    @property
+    def is_outage(self) -> bool:
+        """True when the upstream itself is failing rather than rejecting this request."""
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+class ScrapeClient:
+    """
+    Shared async transport for every scrape.do request made by the BookMyShow tools.
+
+    A single pooled `httpx.AsyncClient` is kept alive for the lifetime of the
+    server so proxy round trips overlap on the event loop instead of blocking it.
+    Each request goes through an `UpstreamPolicy` (per-attempt timeout, retries
+    with backoff, hedging past the observed p95), and every attempt it makes
+    waits for its own `UpstreamScheduler` slot (priority, credit budget, max in
+    flight overall and per target host).
+    """
+
+    def __init__(
+        self,
+        token: str | None,
+        endpoint: str = SCRAPE_DO_ENDPOINT,
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        max_connections: int = 32,
+        max_keepalive_connections: int = 16,
+        keepalive_expiry: float = 30.0,
+        policy: UpstreamPolicy | None = None,
+        scheduler: UpstreamScheduler | None = None,
+    ):
+        self.token = token
+        self.endpoint = endpoint
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.policy = policy or UpstreamPolicy()
+        self.scheduler = scheduler or UpstreamScheduler()
+        self._client: httpx.AsyncClient | None = None
+
+    @classmethod
+    def from_env(cls, token: str | None, scheduler: UpstreamScheduler | None = None) -> "ScrapeClient":
+        """Build a client using the SCRAPE_* environment variables as overrides."""
+        env = os.environ
+        return cls(
+            token,
+            endpoint=env.get("SCRAPE_DO_ENDPOINT", SCRAPE_DO_ENDPOINT),
+            timeout=float(env.get("SCRAPE_TIMEOUT", 60)),
+            connect_timeout=float(env.get("SCRAPE_CONNECT_TIMEOUT", 10)),
+            max_connections=int(env.get("SCRAPE_MAX_CONNECTIONS", 32)),
+            max_keepalive_connections=int(env.get("SCRAPE_MAX_KEEPALIVE", 16)),
+            policy=UpstreamPolicy.from_env("SCRAPE_"),
+            scheduler=scheduler,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    def api_url(self, target_url: str) -> str:
+        """Wrap a BookMyShow URL in a scrape.do API request URL."""
+        return f"{self.endpoint}?token={self.token}&url={urllib.parse.quote(target_url)}"
+
+    async def get(self, target_url: str) -> httpx.Response:
+        """Fetch `target_url` through scrape.do, raising UpstreamError on transport or HTTP errors."""
+        api_url = self.api_url(target_url)
+        host = urllib.parse.urlsplit(target_url).hostname or ""
+
+        async def send() -> httpx.Response:
+            return await self.client.get(api_url)
+
+        def admit():
+            # One slot (and credit) per attempt, released while backing off.
+            return self.scheduler.slot(host=host)
+
+        try:
+            with metrics.span("bms_upstream_seconds", upstream="scrape.do"):
+                response = await self.policy.run(send, admit)
+        except httpx.HTTPError as e:
+            metrics.inc("bms_upstream_responses_total", upstream="scrape.do", status="error")
+            raise UpstreamError(f"Failed to fetch {target_url}: {e!r}")
+
+        metrics.inc("bms_upstream_responses_total", upstream="scrape.do", status=str(response.status_code))
+
+        if response.status_code >= 400:
+            raise UpstreamError(f"Failed to fetch {target_url} - status code {response.status_code}", response.status_code)
+        return response
+
+    async def get_text(self, target_url: str) -> str:
+        return (await self.get(target_url)).text
+
+    async def get_bytes(self, target_url: str) -> bytes:
+        return (await self.get(target_url)).content
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
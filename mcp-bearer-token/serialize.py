@@ -0,0 +1,13 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # a project dependency; the stdlib encoder covers bare checkouts
+    orjson = None
+
+
+def dumps_compact(obj) -> str:
+    """Serialize `obj` to minified JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,228 @@
+import sys
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Callable
+
+
+def parse_paise(price) -> int | None:
+    """Convert a BookMyShow price such as "300.00" to integer paise (30000)."""
+    if price is None:
+        return None
+    try:
+        return int(Decimal(str(price)) * 100)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def format_paise(paise: int | None) -> str | None:
+    """Format integer paise back into the "300.00" form BookMyShow uses."""
+    if paise is None:
+        return None
+    return f"{paise // 100}.{paise % 100:02d}"
+
+
+def _intern(text: str | None) -> str | None:
+    return sys.intern(text) if isinstance(text, str) else text
+
+
+@dataclass(frozen=True, slots=True)
+class Category:
+    seat_type: str | None
+    price_paise: int | None
+
+    def to_dict(self) -> dict:
+        return {"seatType": self.seat_type, "price": format_paise(self.price_paise)}
+
+
+@dataclass(frozen=True, slots=True)
+class Show:
+    time: str | None
+    session_id: str | None
+    categories: tuple[Category, ...]
+
+    def to_dict(self) -> dict:
+        return {
+            "time": self.time,
+            "sessionId": self.session_id,
+            "categories": [cat.to_dict() for cat in self.categories],
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class Venue:
+    name: str | None
+    code: str | None
+    shows: tuple[Show, ...]
+
+    def to_dict(self) -> dict:
+        return {
+            "venueName": self.name,
+            "venueCode": self.code,
+            "shows": [show.to_dict() for show in self.shows],
+        }
+
+
+@lru_cache(maxsize=4096)
+def _category(seat_type: str | None, price: str | None) -> Category:
+    # Seat type/price pairs repeat across shows and venues, so identical
+    # categories share one immutable instance.
+    return Category(_intern(seat_type), parse_paise(price))
+
+
+def extract_venues(widgets: list) -> list[Venue]:
+    """
+    Flatten BookMyShow showtime widgets into the compact venue snapshot shared by the tools.
+
+    Use `Venue.to_dict()` (or `venues_to_dicts`) to produce the JSON tool output:
+        {
+            "venueName": "<Venue Name>",
+            "venueCode": "<venue code>",
+            "shows": [
+                {
+                    "time": "<show time>",
+                    "sessionId": "<session id>",
+                    "categories": [{"seatType": "<type>", "price": "<price>"}, ...]
+                },
+                ...
+            ]
+        }
+    """
+    results = []
+
+    for widget in widgets:
+        if widget.get("type") == "groupList" and widget.get("id") == "List_1":
+            for group in widget.get("data", []):
+                if group.get("type") == "venueGroup" and group.get("id") == "Venue_GROUP_1":
+                    for venue in group.get("data", []):
+                        if venue.get("type") == "venue-card":
+                            vdata = venue.get("additionalData", {})
+                            shows = []
+                            for show in venue.get("showtimes", []):
+                                show_data = show.get("additionalData", {})
+                                shows.append(Show(
+                                    _intern(show.get("title") or show.get("showTime")),
+                                    show_data.get("sessionId"),
+                                    tuple(
+                                        _category(cat.get("priceDesc"), cat.get("curPrice"))
+                                        for cat in show_data.get("categories", [])
+                                    ),
+                                ))
+                            results.append(Venue(
+                                _intern(vdata.get("venueName")),
+                                _intern(vdata.get("venueCode")),
+                                tuple(shows),
+                            ))
+
+    return results
+
+
+# Returns the booking handle to attach to a show, or None to leave it out.
+ShowHandle = Callable[[Venue, Show], str | None]
+
+
+def _with_handle(show_dict: dict, venue: Venue, show: Show, handle: ShowHandle | None) -> dict:
+    """Attach the show's handle, which carries its session id, in place of `sessionId`."""
+    if handle is not None:
+        token = handle(venue, show)
+        if token is not None:
+            del show_dict["sessionId"]
+            show_dict["handle"] = token
+    return show_dict
+
+
+def venues_to_dicts(venues: list[Venue], handle: ShowHandle | None = None) -> list[dict]:
+    if handle is None:
+        return [venue.to_dict() for venue in venues]
+    return [
+        {
+            "venueName": venue.name,
+            "venueCode": venue.code,
+            "shows": [_with_handle(show.to_dict(), venue, show, handle) for show in venue.shows],
+        }
+        for venue in venues
+    ]
+
+
+def venues_from_dicts(items: list[dict]) -> list[Venue]:
+    """Rebuild a snapshot from `venues_to_dicts` output, e.g. when loading it from the disk cache."""
+    return [
+        Venue(
+            _intern(item["venueName"]),
+            _intern(item["venueCode"]),
+            tuple(
+                Show(
+                    _intern(show["time"]),
+                    show["sessionId"],
+                    tuple(_category(cat["seatType"], cat["price"]) for cat in show["categories"]),
+                )
+                for show in item["shows"]
+            ),
+        )
+        for item in items
+    ]
+
+
+class CompactEncoder:
+    """
+    Builds compact venue payloads that share one seat category table.
+
+    Each distinct (seatType, price) pair is listed once in `categories` and
+    shows refer to it by index, so several snapshots encoded with the same
+    encoder (e.g. a batch of movies) share a single table.
+    """
+
+    def __init__(self):
+        self.categories: list[list] = []
+        self._index: dict[Category, int] = {}
+
+    def _ref(self, cat: Category) -> int:
+        idx = self._index.get(cat)
+        if idx is None:
+            idx = self._index[cat] = len(self.categories)
+            self.categories.append([cat.seat_type, format_paise(cat.price_paise)])
+        return idx
+
+    def encode(
+        self, venues: list[Venue], max_venues: int = 0, max_shows: int = 0, handle: ShowHandle | None = None
+    ) -> dict:
+        """
+        Return `{"venues": [...]}` for a snapshot. `max_venues` and `max_shows`
+        (per venue) cap the output when positive; anything dropped is counted
+        under `truncated`. With `handle`, each show also carries its booking handle.
+        """
+        dropped_venues = len(venues) - max_venues if 0 < max_venues < len(venues) else 0
+        dropped_shows = 0
+        out_venues = []
+
+        for venue in venues[:max_venues] if dropped_venues else venues:
+            shows = venue.shows
+            if 0 < max_shows < len(shows):
+                dropped_shows += len(shows) - max_shows
+                shows = shows[:max_shows]
+            out_venues.append({
+                "venueName": venue.name,
+                "venueCode": venue.code,
+                "shows": [
+                    _with_handle({
+                        "time": show.time,
+                        "sessionId": show.session_id,
+                        "categories": [self._ref(cat) for cat in show.categories],
+                    }, venue, show, handle)
+                    for show in shows
+                ],
+            })
+
+        payload = {"venues": out_venues}
+        if dropped_venues or dropped_shows:
+            payload["truncated"] = {"venues": dropped_venues, "shows": dropped_shows}
+        return payload
+
+
+def venues_to_compact(
+    venues: list[Venue], max_venues: int = 0, max_shows: int = 0, handle: ShowHandle | None = None
+) -> dict:
+    """Build the compact venue-details payload for one snapshot (see `CompactEncoder`)."""
+    encoder = CompactEncoder()
+    payload = encoder.encode(venues, max_venues, max_shows, handle)
+    return {"categories": encoder.categories, **payload}
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import markdownify
+import readabilipy
+
+from cache import TTLCache
+from metrics import metrics
+
+SIMPLIFY_FAILED = "<error>Page failed to be simplified from HTML</error>"
+
+
+def html_to_markdown(html: str, use_readability: bool = True) -> str | None:
+    """
+    Simplify `html` with readabilipy and convert the article body to Markdown.
+
+    `use_readability=True` runs Mozilla's Readability through Node.js;
+    `use_readability=False` uses readabilipy's pure-Python simplifier, which is
+    less selective but has no external process and bounded cost.
+    Returns None when nothing usable could be extracted.
+    """
+    ret = readabilipy.simple_json.simple_json_from_html_string(html, use_readability=use_readability)
+    if not ret or not ret.get("content"):
+        return None
+    return markdownify.markdownify(ret["content"], heading_style=markdownify.ATX)
+
+
+class HtmlSimplifier:
+    """
+    Runs HTML-to-Markdown simplification off the event loop.
+
+    Readability runs in a bounded worker pool (processes by default, so
+    CPU-heavy pages do not hold the GIL for the server) with a per-page
+    `timeout`; input beyond `max_chars` is cut before simplifying. When
+    Readability is slow, fails or finds nothing, the pure-Python simplifier is
+    used instead, and after a timeout Readability is skipped for `cooldown`
+    seconds rather than queueing behind a stuck worker. Results are cached by
+    URL and content hash, so re-fetching an unchanged page skips the work.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        kind: str = "process",
+        timeout: float = 10.0,
+        max_chars: int = 1_000_000,
+        cooldown: float = 60.0,
+        cache_ttl: float = 600.0,
+        cache_size: int = 64,
+    ):
+        self.workers = workers
+        self.kind = kind
+        self.timeout = timeout
+        self.max_chars = max_chars
+        self.cooldown = cooldown
+        self._readability_after = 0.0
+        self.cache = TTLCache(ttl=cache_ttl, maxsize=cache_size)
+        self._pool: Executor | None = None
+
+    @classmethod
+    def from_env(cls) -> "HtmlSimplifier":
+        """Build a simplifier from the BMS_SIMPLIFY_* environment variables."""
+        env = os.environ
+        return cls(
+            workers=int(env.get("BMS_SIMPLIFY_WORKERS", min(2, os.cpu_count() or 1))),
+            kind=env.get("BMS_SIMPLIFY_POOL", "process"),
+            timeout=float(env.get("BMS_SIMPLIFY_TIMEOUT", 10)),
+            max_chars=int(env.get("BMS_SIMPLIFY_MAX_CHARS", 1_000_000)),
+            cooldown=float(env.get("BMS_SIMPLIFY_COOLDOWN", 60)),
+            cache_ttl=float(env.get("BMS_SIMPLIFY_CACHE_TTL", 600)),
+            cache_size=int(env.get("BMS_SIMPLIFY_CACHE_SIZE", 64)),
+        )
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "thread":
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="simplify")
+            else:
+                # spawn: forking a process that already runs an event loop and threads is unsafe
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def simplify(self, url: str, html: str) -> str:
+        """Return the Markdown rendering of `html`, fetched from `url`."""
+        html = html[:self.max_chars]
+        key = (url, hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).digest())
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        content = None
+        if time.monotonic() < self._readability_after:
+            metrics.inc("bms_simplify_fallbacks_total", reason="cooldown")
+        else:
+            content = await self._readability(html)
+
+        if content is None:
+            with metrics.span("bms_stage_seconds", stage="fallback_simplify", source="fetch_url"):
+                content = await asyncio.to_thread(html_to_markdown, html, False)
+
+        result = content or SIMPLIFY_FAILED
+        self.cache.set(key, result)
+        return result
+
+    async def _readability(self, html: str) -> str | None:
+        loop = asyncio.get_running_loop()
+        try:
+            with metrics.span("bms_stage_seconds", stage="readability", source="fetch_url"):
+                content = await asyncio.wait_for(
+                    loop.run_in_executor(self.pool, html_to_markdown, html, True), self.timeout
+                )
+        except asyncio.TimeoutError:
+            self._readability_after = time.monotonic() + self.cooldown
+            metrics.inc("bms_simplify_fallbacks_total", reason="timeout")
+            return None
+        except Exception:
+            metrics.inc("bms_simplify_fallbacks_total", reason="error")
+            return None
+        if content is None:
+            metrics.inc("bms_simplify_fallbacks_total", reason="empty")
+        return content
+
+    def shutdown(self) -> None:
+        if self._pool is None:
+            return
+        # Workers stuck on a slow page (or in readabilipy's Node.js setup) would
+        # otherwise outlive the server.
+        processes = list((getattr(self._pool, "_processes", None) or {}).values())
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        self._pool = None
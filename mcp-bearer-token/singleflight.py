@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from scheduler import SharedPriority, effective_priority, shared_priority
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single in-flight task.
+
+    The first caller for a key starts `fn()` as a task; callers arriving while
+    it is still running await the same task and receive the same result (or
+    exception). The task is shielded, so a caller that gets cancelled does not
+    cancel the work for everyone else. Its upstream requests are queued at the
+    highest priority among the callers waiting on it, so a user joining a
+    background refresh is not stuck behind the refresh's priority.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.shared = 0
+        self._inflight: dict[Hashable, tuple[asyncio.Task, SharedPriority]] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        priority = effective_priority()
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.started += 1
+            shared = SharedPriority(priority)
+            token = shared_priority.set(shared)
+            try:
+                task = asyncio.ensure_future(fn())  # the task's context keeps `shared`
+            finally:
+                shared_priority.reset(token)
+            self._inflight[key] = (task, shared)
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+            task, shared = flight
+            shared.join(priority)
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"started": self.started, "shared": self.shared, "inflight": len(self._inflight)}
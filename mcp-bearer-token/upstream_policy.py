@@ -0,0 +1,199 @@
+import asyncio
+import contextlib
+import os
+import random
+from collections import deque
+from typing import AsyncContextManager, Awaitable, Callable
+
+import httpx
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class LatencyWindow:
+    """Rolling window of the most recent successful request latencies (seconds)."""
+
+    def __init__(self, size: int = 256):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class UpstreamPolicy:
+    """
+    Timeout, retry and hedging policy for calls to a slow upstream (scrape.do).
+
+    Every attempt is bounded by `attempt_timeout`. Transport errors, timeouts
+    and 429/5xx responses are retried up to `retries` times with full-jitter
+    exponential backoff (a numeric Retry-After is honoured, capped at
+    `backoff_max`). Once `hedge_min_samples` latencies have been seen, an
+    attempt still running after the observed `hedge_percentile` fires one
+    duplicate request and the first usable response wins; hedges are limited to
+    `hedge_budget` of all requests since each one costs an upstream credit.
+
+    Each request (first try, retry or hedge) is sent inside its own `admit()`
+    context, e.g. a scheduler slot, so nothing is held while backing off. The
+    timeout and the latency sample start once a request has been admitted.
+    """
+
+    def __init__(
+        self,
+        attempt_timeout: float = 30.0,
+        retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge: bool = True,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+        hedge_budget: float = 0.1,
+        window: int = 256,
+    ):
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_budget = hedge_budget
+        self.latencies = LatencyWindow(window)
+        self.requests = 0
+        self.attempts = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    @classmethod
+    def from_env(cls, prefix: str = "SCRAPE_") -> "UpstreamPolicy":
+        """Build a policy from `<prefix>ATTEMPT_TIMEOUT`, `<prefix>RETRIES`, ... environment variables."""
+        env = os.environ
+        return cls(
+            attempt_timeout=float(env.get(f"{prefix}ATTEMPT_TIMEOUT", 30)),
+            retries=int(env.get(f"{prefix}RETRIES", 2)),
+            backoff_base=float(env.get(f"{prefix}BACKOFF_BASE", 0.5)),
+            backoff_max=float(env.get(f"{prefix}BACKOFF_MAX", 8)),
+            hedge=env.get(f"{prefix}HEDGE", "1").lower() not in ("0", "false", "no"),
+            hedge_percentile=float(env.get(f"{prefix}HEDGE_PERCENTILE", 95)),
+            hedge_budget=float(env.get(f"{prefix}HEDGE_BUDGET", 0.1)),
+        )
+
+    def hedge_delay(self) -> float | None:
+        """Seconds after which an attempt is hedged, or None when hedging is off for this request."""
+        if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+            return None
+        if self.hedged >= self.hedge_budget * self.requests:
+            return None
+        return self.latencies.percentile(self.hedge_percentile)
+
+    def backoff(self, attempt: int, response: httpx.Response | None = None) -> float:
+        retry_after = response.headers.get("retry-after", "") if response is not None else ""
+        if retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def run(
+        self,
+        send: Callable[[], Awaitable[httpx.Response]],
+        admit: Callable[[], AsyncContextManager] = contextlib.nullcontext,
+    ) -> httpx.Response:
+        """
+        Call `send` under the policy and return the final response, which may
+        still carry an error status once retries are exhausted. The last
+        httpx error (a TimeoutException for a timed-out attempt) is raised if
+        no attempt got a response.
+        """
+        self.requests += 1
+        for attempt in range(self.retries):
+            response = None
+            try:
+                response = await self._attempt(send, admit)
+            except httpx.TransportError:
+                pass
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+            self.retried += 1
+            await asyncio.sleep(self.backoff(attempt, response))
+        return await self._attempt(send, admit)
+
+    async def _send(
+        self,
+        send: Callable[[], Awaitable[httpx.Response]],
+        admit: Callable[[], AsyncContextManager],
+        admitted: asyncio.Event,
+    ) -> httpx.Response:
+        async with admit():
+            admitted.set()
+            self.attempts += 1
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            try:
+                response = await asyncio.wait_for(send(), self.attempt_timeout)
+            except asyncio.TimeoutError as e:
+                raise httpx.TimeoutException(f"No response within {self.attempt_timeout}s") from e
+        if response.status_code < 500:
+            self.latencies.add(loop.time() - started)
+        return response
+
+    async def _attempt(
+        self, send: Callable[[], Awaitable[httpx.Response]], admit: Callable[[], AsyncContextManager]
+    ) -> httpx.Response:
+        admitted = asyncio.Event()
+        primary = asyncio.ensure_future(self._send(send, admit, admitted))
+        try:
+            delay = self.hedge_delay()
+            if delay is None:
+                return await primary
+            # The hedge clock starts once the primary is actually on the wire.
+            started = asyncio.ensure_future(admitted.wait())
+            try:
+                await asyncio.wait({primary, started}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                started.cancel()
+            await asyncio.wait({primary}, timeout=delay)
+            if primary.done():
+                return primary.result()
+            self.hedged += 1
+            return await self._race(primary, asyncio.ensure_future(self._send(send, admit, asyncio.Event())))
+        finally:
+            primary.cancel()
+
+    async def _race(self, primary: asyncio.Future, hedge: asyncio.Future) -> httpx.Response:
+        """Return the first usable response of two in-flight requests, cancelling the other."""
+        pending = {primary, hedge}
+        fallback = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code not in RETRY_STATUSES:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    fallback = fallback or task
+            return fallback.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "p50": self.latencies.percentile(50),
+            "p95": self.latencies.percentile(95),
+            "p99": self.latencies.percentile(99),
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retried": self.retried,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+        }
@@ -1,47 +1,19 @@
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp-bearer-token"))
+
+from initial_state import all_showtime_widgets, showtime_widgets
+from showtimes import extract_venues, venues_to_dicts
+
 
 def extract_showtimes(json_data, target_date):
-    results = []
-    
-    show_dates = json_data.get("showtimesByEvent", {}).get("showDates", {})
-    date_obj = show_dates.get(target_date, {})
-    widgets = date_obj.get("dynamic", {}).get("data", {}).get("showtimeWidgets", [])
-    
-    for widget in widgets:
-        if widget.get("type") == "groupList" and widget.get("id") == "List_1":
-            for group in widget.get("data", []):
-                if group.get("type") == "venueGroup" and group.get("id") == "Venue_GROUP_1":
-                    for venue in group.get("data", []):
-                        if venue.get("type") == "venue-card":
-                            vdata = venue.get("additionalData", {})
-                            venue_name = vdata.get("venueName")
-                            venue_code = vdata.get("venueCode")
-                            
-                            theatre_info = {
-                                "venueName": venue_name,
-                                "venueCode": venue_code,
-                                "shows": []
-                            }
-                            
-                            # Extract all showtimes
-                            for show in venue.get("showtimes", []):
-                                show_time = show.get("title") or show.get("showTime")
-                                session_id = show.get("additionalData", {}).get("sessionId")
-                                categories = []
-                                for cat in show.get("additionalData", {}).get("categories", []):
-                                    categories.append({
-                                        "seatType": cat.get("priceDesc"),
-                                        "price": cat.get("curPrice")
-                                    })
-                                
-                                theatre_info["shows"].append({
-                                    "time": show_time,
-                                    "sessionId": session_id,
-                                    "categories": categories
-                                })
-
-                            results.append(theatre_info)
-    return results
+    return venues_to_dicts(extract_venues(showtime_widgets(json_data, target_date)))
+
+
+def extract_all_showtimes(json_data):
+    return {date: venues_to_dicts(extract_venues(widgets)) for date, widgets in all_showtime_widgets(json_data).items()}
 
 
 if __name__ == "__main__":
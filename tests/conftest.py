@@ -0,0 +1,6 @@
+import os
+import sys
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp-bearer-token")
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
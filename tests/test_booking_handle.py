@@ -0,0 +1,68 @@
+import base64
+
+import pytest
+
+from booking_handle import BookingHandle, HandleSigner
+
+SHOW = BookingHandle("new-delhi", "ET00012345", "INZS", "70611", "20250811")
+
+
+@pytest.fixture
+def signer() -> HandleSigner:
+    return HandleSigner(b"secret")
+
+
+def context_of(signer: HandleSigner, show: BookingHandle = SHOW) -> str:
+    return signer.encode_context(show.city_slug, show.movie_id, show.date)
+
+
+def test_round_trip(signer):
+    decoded = signer.decode(context_of(signer), signer.encode(SHOW))
+    assert decoded == SHOW
+    assert decoded.seat_layout_url() == (
+        "https://in.bookmyshow.com/movies/new-delhi/seat-layout/ET00012345/INZS/70611/20250811"
+    )
+
+
+def test_other_secret_is_rejected(signer):
+    with pytest.raises(ValueError):
+        HandleSigner(b"other").decode(context_of(signer), signer.encode(SHOW))
+
+
+def test_tampered_tag_is_rejected(signer):
+    token = signer.encode(SHOW)
+    raw = bytearray(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    raw[-1] ^= 1
+    tampered = base64.urlsafe_b64encode(bytes(raw)).rstrip(b"=").decode("ascii")
+    with pytest.raises(ValueError, match="Invalid"):
+        signer.decode(context_of(signer), tampered)
+
+
+def test_handle_from_another_context_is_rejected(signer):
+    other = context_of(signer, SHOW._replace(movie_id="ET00099999"))
+    with pytest.raises(ValueError, match="Invalid"):
+        signer.decode(other, signer.encode(SHOW))
+
+
+@pytest.mark.parametrize("cut", [1, 4, 12])
+def test_truncated_token_is_rejected(signer, cut):
+    token = signer.encode(SHOW)
+    with pytest.raises(ValueError):
+        signer.decode(context_of(signer), token[:-cut])
+    with pytest.raises(ValueError):
+        signer.decode(context_of(signer)[:-cut], token)
+
+
+def test_malformed_token_is_rejected(signer):
+    with pytest.raises(ValueError, match="Malformed"):
+        signer.decode(context_of(signer), "not base64!")
+
+
+@pytest.mark.parametrize("field", SHOW._fields)
+def test_fields_with_separator_or_empty_cannot_be_encoded(signer, field):
+    for bad in ("a|b", ""):
+        show = SHOW._replace(**{field: bad})
+        with pytest.raises(ValueError):
+            signer.encode(show)
+    with pytest.raises(ValueError):
+        signer.encode_context("a|b", SHOW.movie_id, SHOW.date)
@@ -0,0 +1,163 @@
+import asyncio
+
+import httpx
+import pytest
+from mcp import ErrorData, McpError
+from mcp.types import INVALID_PARAMS
+
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, UpstreamGuard
+from scrape_client import UpstreamError
+from singleflight import SingleFlight
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_guard(threshold: int = 3, reset: float = 30.0) -> tuple[UpstreamGuard, FakeClock]:
+    clock = FakeClock()
+    return UpstreamGuard(CircuitBreaker(threshold, reset, clock=clock)), clock
+
+
+def failing(guard: UpstreamGuard, exc: Exception):
+    async def call():
+        raise exc
+
+    async def load():
+        return await guard.observe(call())
+    return load
+
+
+def test_breaker_opens_after_threshold_and_probes_after_reset():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    clock.now = 9.9
+    assert not breaker.allow()
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.retry_in() == 10
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_shared_failure_counts_once():
+    guard, _ = make_guard(threshold=2)
+    flights = SingleFlight()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        raise UpstreamError("down", 503)
+
+    async def load():
+        return await guard.observe(call())
+
+    async def main():
+        results = await asyncio.gather(
+            *(guard.fetch("a", lambda: flights.do("a", load)) for _ in range(5)), return_exceptions=True
+        )
+        assert all(isinstance(r, UpstreamError) for r in results)
+
+    asyncio.run(main())
+    assert calls == 1
+    assert guard.breaker.failures == 1
+    assert guard.breaker.state == CLOSED
+
+
+@pytest.mark.parametrize("exc", [
+    UpstreamError("not found", 404),
+    McpError(ErrorData(code=INVALID_PARAMS, message="Unknown movie")),
+    RuntimeError("Could not parse __INITIAL_STATE__ JSON"),
+])
+def test_request_errors_do_not_trip(exc):
+    guard, _ = make_guard(threshold=1)
+
+    async def main():
+        with pytest.raises(type(exc)):
+            await guard.fetch("bad", failing(guard, exc))
+
+    asyncio.run(main())
+    assert guard.breaker.state == CLOSED and guard.breaker.trips == 0
+
+
+@pytest.mark.parametrize("exc", [
+    UpstreamError("timeout"),
+    UpstreamError("throttled", 429),
+    UpstreamError("bad gateway", 502),
+    httpx.ConnectError("refused"),
+])
+def test_outages_trip(exc):
+    guard, _ = make_guard(threshold=1)
+
+    async def main():
+        with pytest.raises(type(exc)):
+            await guard.fetch("k", failing(guard, exc))
+        with pytest.raises(McpError, match="unavailable"):
+            await guard.fetch("other", failing(guard, exc))
+
+    asyncio.run(main())
+    assert guard.breaker.state == OPEN
+
+
+def test_open_circuit_serves_stale_and_revalidates():
+    guard, clock = make_guard(threshold=1, reset=30)
+    guard.remember("k", "old")
+    loads = 0
+
+    async def upstream():
+        return "new"
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        return await guard.observe(upstream())
+
+    async def main():
+        assert await guard.fetch("k", failing(guard, UpstreamError("down", 500))) == ("old", pytest.approx(0, abs=1))
+        assert guard.breaker.state == OPEN
+
+        value, age = await guard.fetch("k", load)
+        assert value == "old" and age is not None and loads == 0
+
+        clock.now = 30
+        value, age = await guard.fetch("k", load)
+        assert value == "old" and age is not None
+        await asyncio.sleep(0.01)
+        assert loads == 1 and guard.breaker.state == CLOSED
+        assert await guard.fetch("k", load) == ("new", None)
+
+    asyncio.run(main())
+
+
+def test_probe_without_upstream_call_is_released():
+    guard, clock = make_guard(threshold=1, reset=30)
+
+    async def from_disk():
+        return "cached"
+
+    async def main():
+        with pytest.raises(UpstreamError):
+            await guard.fetch("k", failing(guard, UpstreamError("down", 500)))
+        clock.now = 30
+        assert await guard.fetch("other", from_disk) == ("cached", None)
+        assert guard.breaker.state == HALF_OPEN
+        assert guard.breaker.allow()  # next caller gets to probe
+
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+import importlib
+
+import pytest
+
+import listing_parser
+from listing_parser import BACKENDS, parse_listing
+
+PAGE = """<?xml version="1.0" encoding="iso-8859-1"?>
+<!DOCTYPE html>
+<html><body>
+<a href="/movies/new-delhi/saiyaara/ET00447951">Saiyaara</a>
+<a href='/movies/new-delhi/war-2/ET00356501'>War 2 &amp; more</a>
+<a href="/movies/new-delhi/saiyaara/ET00447951/">again</a>
+<a href="/explore/home/new-delhi">home</a>
+<a href="/movies/new-delhi/caf&#233;-stories/ET00000042">Café Stories</a>
+</body></html>"""
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_agree_on_pages_with_an_xml_declaration(backend):
+    if backend == "lxml" and listing_parser.etree is None:
+        pytest.skip("lxml is not installed")
+    assert parse_listing(PAGE, "new-delhi", backend) == [
+        {"id": "ET00447951", "name": "Saiyaara", "slug": "saiyaara"},
+        {"id": "ET00356501", "name": "War 2", "slug": "war-2"},
+        {"id": "ET00000042", "name": "Café Stories", "slug": "café-stories"},
+    ]
+
+
+def test_unknown_backend_is_rejected_at_import(monkeypatch):
+    monkeypatch.setenv("BMS_LISTING_PARSER", "lxm")
+    with pytest.raises(ValueError, match="BMS_LISTING_PARSER"):
+        importlib.reload(listing_parser)
+    monkeypatch.delenv("BMS_LISTING_PARSER")
+    importlib.reload(listing_parser)
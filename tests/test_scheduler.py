@@ -0,0 +1,152 @@
+import asyncio
+
+from scheduler import BACKGROUND, BATCH, INTERACTIVE, UpstreamScheduler, upstream_priority
+from singleflight import SingleFlight
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_small_bucket_does_not_starve_low_priority():
+    clock = FakeClock()
+
+    async def main():
+        scheduler = UpstreamScheduler(credits_per_minute=6, clock=clock)
+        assert scheduler.burst == 1.0
+        async with scheduler.slot(INTERACTIVE):
+            pass
+
+        granted = asyncio.Event()
+
+        async def batch():
+            async with scheduler.slot(BATCH):
+                granted.set()
+
+        task = asyncio.create_task(batch())
+        await settle()
+        assert not granted.is_set()  # bucket is empty
+
+        clock.now = 10  # 0.1 credits/s refills the single credit
+        scheduler._on_timer()
+        await settle()
+        assert granted.is_set()
+        await task
+
+    asyncio.run(main())
+
+
+def test_reserve_is_kept_for_interactive_requests():
+    clock = FakeClock()
+
+    async def main():
+        scheduler = UpstreamScheduler(credits_per_minute=60, burst=10, reserve=0.2, clock=clock)
+        scheduler.tokens = 2.5
+        order = []
+
+        async def request(priority, name):
+            async with scheduler.slot(priority):
+                order.append(name)
+
+        background = asyncio.create_task(request(BACKGROUND, "background"))
+        await settle()
+        assert order == []  # needs 1 + 0.2 * 10 credits
+        await request(INTERACTIVE, "interactive")
+        assert order == ["interactive"]
+
+        clock.now = 2
+        scheduler._on_timer()
+        await background
+        assert order == ["interactive", "background"]
+
+    asyncio.run(main())
+
+
+def test_joining_caller_raises_flight_priority():
+    async def main():
+        scheduler = UpstreamScheduler(max_in_flight=1)
+        flights = SingleFlight()
+        order = []
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot(INTERACTIVE):
+                await release.wait()
+
+        async def scrape(name):
+            async with scheduler.slot():
+                order.append(name)
+            return name
+
+        holder = asyncio.create_task(hold())
+        await settle()
+
+        with upstream_priority(BACKGROUND):
+            prewarm = asyncio.create_task(flights.do("page", lambda: scrape("page")))
+        with upstream_priority(BATCH):
+            batch = asyncio.create_task(scrape("batch"))
+        await settle()
+
+        user = asyncio.create_task(flights.do("page", lambda: scrape("unused")))
+        await settle()
+
+        release.set()
+        assert await asyncio.gather(prewarm, user, batch, holder) == ["page", "page", "batch", None]
+        assert order == ["page", "batch"]
+
+    asyncio.run(main())
+
+
+def test_host_limit_is_applied_in_priority_order():
+    async def main():
+        scheduler = UpstreamScheduler()  # 16 in flight, 8 per host
+        order = []
+        release = asyncio.Event()
+
+        async def scrape(priority, name):
+            async with scheduler.slot(priority, host="in.bookmyshow.com"):
+                order.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(scrape(BACKGROUND, f"bg{i}")) for i in range(20)]
+        await settle()
+        tasks.append(asyncio.create_task(scrape(INTERACTIVE, "user")))
+        await settle()
+        assert len(order) == scheduler.per_host_limit
+        assert scheduler.stats()["queued"] == 13
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order.index("user") == scheduler.per_host_limit  # first to go once the host frees up
+
+    asyncio.run(main())
+
+
+def test_other_hosts_are_not_blocked_by_a_busy_host():
+    async def main():
+        scheduler = UpstreamScheduler(per_host_limit=1)
+        release = asyncio.Event()
+        granted = []
+
+        async def scrape(host):
+            async with scheduler.slot(INTERACTIVE, host=host):
+                granted.append(host)
+                await release.wait()
+
+        tasks = [asyncio.create_task(scrape(host)) for host in ("a", "a", "b")]
+        await settle()
+        assert granted == ["a", "b"]
+        release.set()
+        await asyncio.gather(*tasks)
+        assert granted == ["a", "b", "a"] and scheduler.host_in_flight == {}
+
+    asyncio.run(main())
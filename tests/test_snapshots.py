@@ -0,0 +1,55 @@
+import asyncio
+import os
+
+os.environ.setdefault("AUTH_TOKEN", "test")
+os.environ.setdefault("MY_NUMBER", "910000000000")
+os.environ["BMS_DISK_CACHE_PATH"] = ""
+
+import pytest  # noqa: E402
+from mcp import McpError  # noqa: E402
+
+import mcp_starter  # noqa: E402
+from breaker import OPEN, CircuitBreaker, UpstreamGuard  # noqa: E402
+from disk_cache import DiskCache  # noqa: E402
+from showtimes import venues_to_dicts  # noqa: E402
+
+MOVIES = [{"id": "ET00000001", "name": "Sample", "slug": "sample"}]
+
+
+@pytest.fixture
+def open_circuit(monkeypatch, tmp_path):
+    guard = UpstreamGuard(CircuitBreaker(failure_threshold=1, reset_timeout=30))
+    guard.breaker.record_failure()
+    assert guard.breaker.state == OPEN
+    disk = DiskCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(mcp_starter, "upstream_guard", guard)
+    monkeypatch.setattr(mcp_starter, "disk_cache", disk)
+    mcp_starter.listing_cache.clear()
+    mcp_starter.showtime_cache.clear()
+    yield disk
+    mcp_starter.listing_cache.clear()
+    mcp_starter.showtime_cache.clear()
+
+
+def test_open_circuit_serves_fresh_disk_listing(open_circuit):
+    async def main():
+        await open_circuit.set("listing:udaipur", MOVIES, 600)
+        return await mcp_starter.city_movies_snapshot("udaipur")
+
+    assert asyncio.run(main()) == (MOVIES, None)
+
+
+def test_open_circuit_serves_fresh_disk_showtimes(open_circuit):
+    async def main():
+        await open_circuit.set("showtimes:udaipur:ET00000001:20250811", venues_to_dicts([]), 600)
+        return await mcp_starter.showtimes_snapshot("udaipur", "sample", "ET00000001", "20250811")
+
+    assert asyncio.run(main()) == ([], None)
+
+
+def test_open_circuit_without_cached_copy_fails_fast(open_circuit):
+    async def main():
+        return await mcp_starter.city_movies_snapshot("pune")
+
+    with pytest.raises(McpError, match="unavailable"):
+        asyncio.run(main())
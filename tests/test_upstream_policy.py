@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from scheduler import INTERACTIVE, UpstreamScheduler
+from upstream_policy import UpstreamPolicy
+
+
+class FakeSend:
+    """Plays back one behaviour per call: a status code, or a delay in seconds before a 200."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self) -> httpx.Response:
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        if isinstance(step, int):
+            return httpx.Response(step)
+        try:
+            await asyncio.sleep(step)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return httpx.Response(200, headers={"x-call": str(self.calls)})
+
+
+def hedging_policy(**kwargs) -> UpstreamPolicy:
+    policy = UpstreamPolicy(hedge_min_samples=1, hedge_budget=1.0, backoff_base=0, **kwargs)
+    policy.latencies.add(0.01)
+    return policy
+
+
+def test_hedge_wins_and_cancels_the_slow_primary():
+    policy = hedging_policy()
+    send = FakeSend(10.0, 0.0)
+
+    response = asyncio.run(policy.run(send))
+    assert response.status_code == 200
+    assert (send.calls, send.cancelled) == (2, 1)
+    assert (policy.hedged, policy.hedge_wins) == (1, 1)
+
+
+def test_timed_out_attempts_are_cancelled_and_retried():
+    policy = hedging_policy(attempt_timeout=0.05, retries=1)
+    send = FakeSend(10.0, 10.0, 0.0)
+
+    response = asyncio.run(policy.run(send))
+    assert response.status_code == 200
+    assert send.calls == 3 and send.cancelled == 2  # primary and hedge both timed out
+    assert policy.retried == 1
+
+
+def test_last_attempt_timing_out_raises():
+    policy = UpstreamPolicy(attempt_timeout=0.02, retries=1, backoff_base=0, hedge=False)
+    with pytest.raises(httpx.TimeoutException):
+        asyncio.run(policy.run(FakeSend(10.0)))
+
+
+def test_retryable_status_is_retried():
+    policy = UpstreamPolicy(retries=2, backoff_base=0)
+    send = FakeSend(503, 200)
+
+    assert asyncio.run(policy.run(send)).status_code == 200
+    assert (send.calls, policy.retried) == (2, 1)
+
+
+def test_client_errors_are_not_retried():
+    policy = UpstreamPolicy(retries=2, backoff_base=0)
+    send = FakeSend(404, 200)
+
+    assert asyncio.run(policy.run(send)).status_code == 404
+    assert send.calls == 1
+
+
+def test_retry_after_is_capped():
+    policy = UpstreamPolicy(retries=1, backoff_max=0.05)
+    throttled = httpx.Response(429, headers={"retry-after": "120"})
+    assert policy.backoff(0, throttled) == 0.05
+    assert policy.backoff(0, httpx.Response(429, headers={"retry-after": "0"})) == 0
+
+    async def send():
+        return throttled if policy.attempts == 1 else httpx.Response(200)
+
+    started = time.monotonic()
+    assert asyncio.run(policy.run(send)).status_code == 200
+    assert time.monotonic() - started < 1
+
+
+def test_slot_is_released_while_backing_off():
+    async def main():
+        scheduler = UpstreamScheduler(max_in_flight=1)
+        policy = UpstreamPolicy(retries=1, backoff_base=0.2, backoff_max=0.2)
+        policy.backoff = lambda attempt, response=None: 0.2
+        request = asyncio.create_task(policy.run(FakeSend(503, 200), lambda: scheduler.slot(host="h")))
+        await asyncio.sleep(0.05)  # first attempt failed; now sleeping before the retry
+        assert scheduler.in_flight == 0
+        async with scheduler.slot(INTERACTIVE, host="h"):
+            pass
+        assert (await request).status_code == 200
+
+    asyncio.run(main())